@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Leaderboard tool: fetch every trade in a market once, split it by wallet and
+analyze each wallet in a process pool.
+Usage: python3 analyze_market.py "<market_query>" [--top N] [--save FILE]
+"""
+
+import os
+import sys
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze_trades import analyze_trades, current_profitability
+from fetch_trades import add_fetch_options, configure_client, describe_report, find_event, iter_jobs_as_completed
+from serialization import save_file
+from trade_records import Trade, TradeTable, outcome_labels
+from trade_store import TradeStore
+
+DEFAULT_TOP = 20
+
+
+def partition_by_wallet(trades: list) -> dict:
+    """Group a market's trades by proxyWallet in a single pass.
+
+    Trades are reduced to Trade records, which keep only what analyze_trades
+    reads, before they are shipped to worker processes.
+    """
+    by_wallet = defaultdict(list)
+    for trade in trades:
+        by_wallet[trade.get("proxyWallet")].append(Trade.from_dict(trade))
+    by_wallet.pop(None, None)
+    return by_wallet
+
+
+def summarize_wallet(item: tuple) -> dict:
+    """Analyze one wallet's trades and return its leaderboard row.
+
+    The row has a final position per outcome (up_/down_ in a binary market,
+    outcome0_, outcome1_, ... otherwise) and sums over every outcome.
+    """
+    wallet, trades = item
+    table = TradeTable.from_rows(trades)
+    results = analyze_trades(table)
+    labels = outcome_labels(results["outcome_count"])
+    row = {
+        "wallet": wallet,
+        "trades": len(table),
+        "volume": sum(size * price for size, price in zip(table.size, table.price)),
+    }
+    for label in labels:
+        row[f"{label}_final_position"] = results[f"{label}_final_position"]
+    row.update({
+        "net_investment": sum(results[f"{label}_cost_basis"] - results[f"{label}_proceeds"] for label in labels),
+        "total_realized_pnl": results["total_realized_pnl"],
+        "combined_avg_price": sum(results[f"{label}_avg_price"] for label in labels),
+        "is_profitable": current_profitability(results),
+    })
+    return row
+
+
+def build_leaderboard(trades: list, processes: int = None) -> list:
+    """Analyze every wallet in a market's trades, best realized PnL first."""
+    items = list(partition_by_wallet(trades).items())
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(items) < 2:
+        rows = [summarize_wallet(item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunksize = max(1, len(items) // (processes * 4))
+            rows = list(pool.map(summarize_wallet, items, chunksize=chunksize))
+    rows.sort(key=lambda row: row["total_realized_pnl"], reverse=True)
+    return rows
+
+
+def print_leaderboard(rows: list, top: int = DEFAULT_TOP) -> None:
+    """Print the best wallets of a leaderboard."""
+    combined = "YES+NO Avg" if not rows or "up_final_position" in rows[0] else "Avg Sum"
+    print(f"{'#':>4}  {'Wallet':<42}  {'Trades':>7}  {'Volume':>12}  {'Realized PnL':>13}  {combined:>10}")
+    for rank, row in enumerate(rows[:top], 1):
+        status = {True: "✅", False: "❌", None: ""}[row["is_profitable"]]
+        print(
+            f"{rank:>4}  {row['wallet']:<42}  {row['trades']:>7}  ${row['volume']:>11.2f}  "
+            f"${row['total_realized_pnl']:>12.2f}  ${row['combined_avg_price']:>8.4f} {status}"
+        )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Rank every wallet that traded in an event's markets.",
+        epilog="Example:\n  python3 analyze_market.py \"Solana Up or Down on February 5?\" --top 10",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("market_query", help="search query (or cached conditionId) used to find the event")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"wallets to print per market (default: {DEFAULT_TOP})")
+    parser.add_argument("--processes", type=int, default=None, help="analysis processes (default: CPU count)")
+    parser.add_argument("--save", metavar="FILE", help="save every market's full leaderboard as JSON")
+    add_fetch_options(parser, output=False)
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function - fetch whole markets and rank their wallets."""
+    args = parse_args()
+    configure_client(args)
+
+    event, markets = find_event(args.market_query, args.search_cache)
+    if not event or not markets:
+        print("Error: No market found for that query.", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nFound event: {event.get('title', 'Unknown Event')}\n")
+
+    # Markets are fetched concurrently and ranked as each one arrives
+    store = TradeStore(args.store) if args.store else None
+    leaderboards = {}
+    try:
+        jobs = [(market, None) for market in markets]
+        for idx, market, _, trades, report in iter_jobs_as_completed(
+            jobs, max_workers=args.workers, store=store,
+            page_workers=args.page_workers, pagination=args.pagination,
+        ):
+            condition_id = market["conditionId"]
+            market_title = market.get("question") or market.get("title") or event.get("title", "Unknown Market")
+            print(f"  {describe_report(report)}")
+            print()
+            print("=" * 80)
+            print(f"LEADERBOARD: {market_title}")
+            print("=" * 80)
+            if not trades:
+                print("No trades found in this market.")
+                print()
+                continue
+
+            rows = build_leaderboard(trades, args.processes)
+            print(f"{len(trades)} trades by {len(rows)} wallets")
+            print()
+            print_leaderboard(rows, args.top)
+            print()
+            leaderboards[idx] = (condition_id, {"title": market_title, "complete": report["complete"], "wallets": rows})
+    finally:
+        if store is not None:
+            store.close()
+
+    if args.save:
+        save_file(args.save, dict(leaderboards[idx] for idx in sorted(leaderboards)))
+        print(f"Leaderboards saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
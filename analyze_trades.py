@@ -4,255 +4,701 @@ Comprehensive trade analysis script.
 Calculates profitability, PnL, position tracking, and trading behavior insights.
 """
 
-import json
+import os
 import sys
-from datetime import datetime
+import argparse
+from itertools import repeat
+from datetime import datetime, timedelta
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
+from serialization import DECODE_ERRORS, load_file, save_file
+from running_stats import RunningStats
+from trade_records import BUY, SELL, TradeTable, assign_outcome, outcome_labels
 
-def load_trades(filename="visualization/trades.json"):
-    """Load trades from JSON file."""
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_OUTPUT = "visualization/analysis_results.json"
+# Below this many trades per process, a pool costs more than it saves
+PARALLEL_MIN_CHUNK = 50_000
+# Markets with fewer trades are analyzed in the main process rather than shipped to a worker
+POOL_MIN_MARKET_TRADES = 20_000
+
+try:
+    import vector_engine
+except ImportError:  # NumPy is optional
+    vector_engine = None
+
+
+def load_trades(filename="visualization/trades.json", by_market=False):
+    """Load trades from JSON file into a TradeTable, or one per market with by_market=True (see partition_by_market)."""
     try:
-        with open(filename, "r") as f:
-            return json.load(f)
+        rows = load_file(filename)
     except FileNotFoundError:
         print(f"Error: File {filename} not found", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError as e:
+    except DECODE_ERRORS as e:
         print(f"Error: Invalid JSON in {filename}: {e}", file=sys.stderr)
         sys.exit(1)
+    if isinstance(rows, dict):
+        # A one-line NDJSON file decodes as a single trade
+        rows = [rows]
+    try:
+        return partition_by_market(rows) if by_market else TradeTable.from_rows(rows)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        print(f"Error: Unexpected trade format in {filename}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def partition_by_market(rows) -> dict:
+    """Group API rows by conditionId in one pass.
+
+    Returns {conditionId: (market title, TradeTable)} in the order the
+    markets first appear; rows without a conditionId form the None market.
+    """
+    groups = defaultdict(list)
+    titles = {}
+    for row in rows:
+        condition_id = row.get("conditionId")
+        groups[condition_id].append(row)
+        if condition_id not in titles:
+            titles[condition_id] = row.get("title")
+    return {condition_id: (titles[condition_id], TradeTable.from_rows(group)) for condition_id, group in groups.items()}
+
 
+def format_timestamp(timestamp: int, fmt: str = TIME_FORMAT) -> str:
+    """Render epoch seconds as local time; only done for values that are shown."""
+    return datetime.fromtimestamp(timestamp).strftime(fmt)
 
-def analyze_trades(trades):
-    """Perform comprehensive trade analysis."""
-    
-    # Sort by timestamp
-    trades.sort(key=lambda x: x["timestamp"])
-    
-    # Initialize tracking variables
-    up_buys = []
-    up_sells = []
-    down_buys = []
-    down_sells = []
-    
-    up_shares_bought = 0
-    up_shares_sold = 0
-    up_cost_basis = 0
-    up_proceeds = 0
-    
-    down_shares_bought = 0
-    down_shares_sold = 0
-    down_cost_basis = 0
-    down_proceeds = 0
-    
-    # Track positions over time
-    up_position = 0
-    down_position = 0
-    up_avg_price = 0
-    down_avg_price = 0
-    up_total_cost = 0
-    down_total_cost = 0
-    
-    profitability_timeline = []
-    
-    # Process each trade
-    for trade in trades:
-        timestamp = trade["timestamp"]
-        dt = datetime.fromtimestamp(timestamp)
-        side = trade["side"]
-        outcome = trade["outcome"]
-        size = trade["size"]
-        price = trade["price"]
+
+class _OutcomeState:
+    """Running totals for one outcome (YES/Up, NO/Down, ...) of a market."""
+
+    __slots__ = (
+        "buys", "sells", "shares_bought", "shares_sold", "cost_basis", "proceeds",
+        "position", "total_cost", "avg_price", "buy_price_stats", "sell_price_stats", "buy_size_stats",
+    )
+
+    def __init__(self):
+        self.buys = 0
+        self.sells = 0
+        self.shares_bought = 0
+        self.shares_sold = 0
+        self.cost_basis = 0
+        self.proceeds = 0
+        self.position = 0
+        self.total_cost = 0
+        self.avg_price = 0
+        # Summaries of the side's buy and sell prices and buy sizes, in constant memory
+        self.buy_price_stats = RunningStats()
+        self.sell_price_stats = RunningStats()
+        self.buy_size_stats = RunningStats()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def add(self, side: int, size: float, price: float) -> None:
+        """Apply one trade; a sell reduces the cost at the current average price."""
         value = size * price
-        
-        if outcome == "Up":
-            if side == "BUY":
-                up_buys.append(trade)
-                up_shares_bought += size
-                up_cost_basis += value
-                up_total_cost += value
-                up_position += size
-                # Update average price (weighted average)
-                if up_position > 0:
-                    up_avg_price = up_total_cost / up_position
-            else:  # SELL
-                up_sells.append(trade)
-                up_shares_sold += size
-                up_proceeds += value
-                up_position -= size
-                # Update average price if position remains
-                if up_position > 0:
-                    up_total_cost -= (size * up_avg_price)
-                    up_avg_price = up_total_cost / up_position if up_position > 0 else 0
-                else:
-                    up_total_cost = 0
-                    up_avg_price = 0
-        else:  # Down
-            if side == "BUY":
-                down_buys.append(trade)
-                down_shares_bought += size
-                down_cost_basis += value
-                down_total_cost += value
-                down_position += size
-                # Update average price (weighted average)
-                if down_position > 0:
-                    down_avg_price = down_total_cost / down_position
-            else:  # SELL
-                down_sells.append(trade)
-                down_shares_sold += size
-                down_proceeds += value
-                down_position -= size
-                # Update average price if position remains
-                if down_position > 0:
-                    down_total_cost -= (size * down_avg_price)
-                    down_avg_price = down_total_cost / down_position if down_position > 0 else 0
-                else:
-                    down_total_cost = 0
-                    down_avg_price = 0
-        
-        # Calculate profitability: avg(YES) + avg(NO) < $1 means profitable
-        # Only calculate if trader has positions in BOTH sides (hedging strategy)
-        if up_position > 0 and down_position > 0:
-            total_avg_price = up_avg_price + down_avg_price
+        if side == BUY:
+            self.buys += 1
+            self.buy_price_stats.add(price)
+            self.buy_size_stats.add(size)
+            self.shares_bought += size
+            self.cost_basis += value
+            self.total_cost += value
+            self.position += size
+            # Update average price (weighted average)
+            if self.position > 0:
+                self.avg_price = self.total_cost / self.position
+        else:  # SELL
+            self.sells += 1
+            self.sell_price_stats.add(price)
+            self.shares_sold += size
+            self.proceeds += value
+            self.position -= size
+            # Update average price if position remains
+            if self.position > 0:
+                self.total_cost -= (size * self.avg_price)
+                self.avg_price = self.total_cost / self.position
+            else:
+                self.total_cost = 0
+                self.avg_price = 0
+
+    def seed(self, position: float, total_cost: float) -> None:
+        """Start from the position and cost left by earlier trades (the prefix carry)."""
+        self.position = position
+        self.total_cost = total_cost
+        # Whenever shares are held, the average price is cost / position
+        self.avg_price = total_cost / position if position > 0 else 0
+
+    def merge(self, later: "_OutcomeState") -> None:
+        """Append the totals of the trades that follow; later must be seeded with this side's end state.
+
+        Counts and sums simply add up; the running position and
+        cost are path-dependent, so they are taken from the later side.
+        """
+        self.buys += later.buys
+        self.sells += later.sells
+        self.shares_bought += later.shares_bought
+        self.shares_sold += later.shares_sold
+        self.cost_basis += later.cost_basis
+        self.proceeds += later.proceeds
+        self.position = later.position
+        self.total_cost = later.total_cost
+        self.avg_price = later.avg_price
+        self.buy_price_stats.merge(later.buy_price_stats)
+        self.sell_price_stats.merge(later.sell_price_stats)
+        self.buy_size_stats.merge(later.buy_size_stats)
+
+    def results(self, name: str) -> dict:
+        """This side's entries of the analysis results, keyed with the name prefix.
+
+        Summaries are copies, so later trades do not change them.
+        """
+        final_position = self.shares_bought - self.shares_sold
+        # Realized PnL from sells
+        avg_cost = self.cost_basis / self.shares_bought if self.shares_bought > 0 else 0
+        return {
+            f"{name}_buy_count": self.buys,
+            f"{name}_sell_count": self.sells,
+            f"{name}_shares_bought": self.shares_bought,
+            f"{name}_shares_sold": self.shares_sold,
+            f"{name}_cost_basis": self.cost_basis,
+            f"{name}_proceeds": self.proceeds,
+            f"{name}_final_position": final_position,
+            f"{name}_avg_price": self.avg_price if final_position > 0 else 0,
+            f"{name}_realized_pnl": self.proceeds - self.shares_sold * avg_cost,
+            f"{name}_buy_price_stats": self.buy_price_stats.copy(),
+            f"{name}_sell_price_stats": self.sell_price_stats.copy(),
+            f"{name}_buy_size_stats": self.buy_size_stats.copy(),
+        }
+
+
+class TradeAnalyzer:
+    """Incremental trade analysis: each new trade is an O(1) update.
+
+    Feed trades in time order with ingest() or ingest_many() and call
+    snapshot() at any point for the same results analyze_trades returns.
+    Positions, average prices, cost, proceeds, the open profitability
+    interval and the best/worst moments are kept as running state, so a
+    monitor only pays for the fills it has not seen yet. The per-trade
+    timeline is only kept with keep_timeline=True. Analyzers pickle, so
+    the state can be saved between runs.
+
+    Each trade goes straight to the state of its outcome, addressed by the
+    outcome's code (its outcomeIndex, see trade_records.assign_outcome), so
+    binary and N-way markets take the same path. outcome_count is the
+    number of outcomes the market has, 2 unless trades show more.
+
+    A history can also be split into chunks: an analyzer started with
+    resume() from the carry at a chunk's first trade analyzes that chunk
+    alone, and merge() joins the chunks' analyzers back in order.
+    """
+
+    def __init__(self, keep_timeline: bool = False, outcome_count: int = 2):
+        self.count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        # Per-outcome state and names by outcome code, and the code of each name seen
+        self.outcomes = []
+        self.names = []
+        self.codes = {}
+        # Each outcome's average price while it is held (else 0), and how many are held
+        self.avg_terms = []
+        self.held = 0
+        self._grow(outcome_count)
+        self.timeline = [] if keep_timeline else None
+        # Closed profitability intervals, and the open one's state and start
+        self.intervals = {True: [], False: []}
+        self.state = None
+        self.state_start = None
+        self.state_start_timestamp = None
+        # State of the first interval, and the index and timestamp of the trade before it
+        self.head = None
+        # Profitable entry with the lowest and unprofitable entry with the highest sum of averages
+        self.best = None
+        self.worst = None
+
+    @classmethod
+    def resume(cls, carry: dict, keep_timeline: bool = False) -> "TradeAnalyzer":
+        """An analyzer for the trades that follow the ones summed up in carry.
+
+        carry holds the number of earlier trades ("count"), the last one's
+        timestamp and each outcome's (position, total_cost), see analyze_parallel().
+        """
+        analyzer = cls(keep_timeline, len(carry["outcomes"]))
+        analyzer.count = carry["count"]
+        analyzer.last_timestamp = carry["last_timestamp"]
+        for code, (position, total_cost) in enumerate(carry["outcomes"]):
+            outcome = analyzer.outcomes[code]
+            outcome.seed(position, total_cost)
+            if position > 0:
+                analyzer.avg_terms[code] = outcome.avg_price
+                analyzer.held += 1
+        return analyzer
+
+    def _grow(self, count: int) -> None:
+        """Make room for outcome codes below count."""
+        while len(self.outcomes) < count:
+            self.outcomes.append(_OutcomeState())
+            self.avg_terms.append(0)
+        self.names.extend([None] * (len(self.outcomes) - len(self.names)))
+        labels = outcome_labels(len(self.outcomes))
+        self._avg_keys = [f"{label}_avg_price" for label in labels]
+        self._position_keys = [f"{label}_position" for label in labels]
+
+    def _code(self, name: str, index=None) -> int:
+        """Code of an outcome name, assigned from its outcomeIndex the first time it is seen."""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = assign_outcome(self.names, name, index)
+            self._grow(len(self.names))
+        return code
+
+    def ingest(self, trade) -> None:
+        """Add one trade (an API dict or Trade record), no older than the last one."""
+        if isinstance(trade, dict):
+            timestamp, side, outcome = int(trade["timestamp"]), trade["side"], trade["outcome"]
+            size, price, index = trade["size"], trade["price"], trade.get("outcomeIndex")
+        else:
+            timestamp, side, outcome, size, price = trade.timestamp, trade.side, trade.outcome, trade.size, trade.price
+            index = trade.outcome_index
+        self._add(timestamp, BUY if side == "BUY" else SELL, self._code(outcome, index), size, price)
+
+    def ingest_many(self, trades) -> None:
+        """Add a batch of trades (API dicts, Trade records or a TradeTable)."""
+        if isinstance(trades, TradeTable):
+            codes = [code if name is None else self._code(name, code) for code, name in enumerate(trades.outcomes)]
+            for timestamp, side, outcome, size, price in zip(
+                trades.timestamp, trades.side, trades.outcome, trades.size, trades.price
+            ):
+                self._add(timestamp, side, codes[outcome], size, price)
+            return
+        for trade in sorted(trades, key=lambda t: t["timestamp"] if isinstance(t, dict) else t.timestamp):
+            self.ingest(trade)
+
+    def _add(self, timestamp: int, side: int, code: int, size: float, price: float) -> None:
+        """Apply one trade to every piece of running state."""
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise ValueError(f"trade at {timestamp} is older than the last one ingested ({self.last_timestamp})")
+        index = self.count
+        outcome = self.outcomes[code]
+        was_held = outcome.position > 0
+        outcome.add(side, size, price)
+
+        # Calculate profitability: sum of the outcomes' avg prices < $1 means profitable
+        # Only calculate if trader has positions in EVERY outcome (hedging strategy)
+        is_held = outcome.position > 0
+        self.held += is_held - was_held
+        self.avg_terms[code] = outcome.avg_price if is_held else 0
+        total_avg_price = sum(self.avg_terms)
+        if self.held == len(self.outcomes):
             is_profitable = total_avg_price < 1.0
-        elif up_position > 0 or down_position > 0:
-            # Only one side - can't determine profitability using this metric
-            total_avg_price = (up_avg_price if up_position > 0 else 0) + (down_avg_price if down_position > 0 else 0)
-            is_profitable = None  # Not applicable for single-sided positions
         else:
-            total_avg_price = 0
+            # Some outcome not held: not applicable
             is_profitable = None
-        
-        profitability_timeline.append({
-            "timestamp": timestamp,
-            "datetime": dt,
-            "up_avg_price": up_avg_price,
-            "down_avg_price": down_avg_price,
-            "total_avg_price": total_avg_price,
-            "is_profitable": is_profitable,
-            "up_position": up_position,
-            "down_position": down_position
-        })
-    
-    # Calculate final positions
-    up_final_position = up_shares_bought - up_shares_sold
-    down_final_position = down_shares_bought - down_shares_sold
-    
-    # Calculate PnL
-    # Realized PnL from sells
-    up_realized_pnl = up_proceeds - (up_shares_sold * (up_cost_basis / up_shares_bought if up_shares_bought > 0 else 0))
-    down_realized_pnl = down_proceeds - (down_shares_sold * (down_cost_basis / down_shares_bought if down_shares_bought > 0 else 0))
-    
-    # Unrealized PnL (if we assume final positions are worth $1 each if profitable)
-    # This is simplified - in reality, you'd need current market prices
-    up_unrealized_pnl = 0  # Would need current market price
-    down_unrealized_pnl = 0  # Would need current market price
-    
-    total_realized_pnl = up_realized_pnl + down_realized_pnl
-    
-    # Analyze profitability intervals
-    profitable_intervals = []
-    unprofitable_intervals = []
-    current_state = None
-    interval_start = None
-    
-    for entry in profitability_timeline:
-        if entry["is_profitable"] is None:
-            continue
-        
-        if current_state != entry["is_profitable"]:
-            if current_state is not None and interval_start is not None:
-                # Close previous interval
-                if current_state:
-                    profitable_intervals.append({
-                        "start": interval_start,
-                        "end": profitability_timeline[profitability_timeline.index(entry) - 1]["datetime"]
-                    })
+
+        entry = None
+        if self.timeline is not None:
+            entry = self._entry(timestamp, total_avg_price, is_profitable)
+            self.timeline.append(entry)
+
+        if is_profitable is not None:
+            # A state change closes the open interval at the previous trade
+            if is_profitable != self.state:
+                if self.state is not None:
+                    self.intervals[self.state].append(
+                        self._interval(self.state_start, self.state_start_timestamp, index - 1, self.last_timestamp)
+                    )
                 else:
-                    unprofitable_intervals.append({
-                        "start": interval_start,
-                        "end": profitability_timeline[profitability_timeline.index(entry) - 1]["datetime"]
-                    })
-            
-            current_state = entry["is_profitable"]
-            interval_start = entry["datetime"]
-    
-    # Close final interval
-    if current_state is not None and interval_start is not None:
-        if current_state:
-            profitable_intervals.append({
-                "start": interval_start,
-                "end": profitability_timeline[-1]["datetime"]
-            })
+                    self.head = (is_profitable, index - 1, self.last_timestamp)
+                self.state = is_profitable
+                self.state_start = index
+                self.state_start_timestamp = timestamp
+            if is_profitable:
+                if self.best is None or total_avg_price < self.best["total_avg_price"]:
+                    self.best = entry or self._entry(timestamp, total_avg_price, is_profitable)
+            elif self.worst is None or total_avg_price > self.worst["total_avg_price"]:
+                self.worst = entry or self._entry(timestamp, total_avg_price, is_profitable)
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.count += 1
+
+    def _entry(self, timestamp: int, total_avg_price: float, is_profitable) -> dict:
+        """The timeline entry for the state after the latest trade."""
+        entry = {"timestamp": timestamp}
+        for key, outcome in zip(self._avg_keys, self.outcomes):
+            entry[key] = outcome.avg_price
+        entry["total_avg_price"] = total_avg_price
+        entry["is_profitable"] = is_profitable
+        for key, outcome in zip(self._position_keys, self.outcomes):
+            entry[key] = outcome.position
+        return entry
+
+    def merge(self, later: "TradeAnalyzer") -> None:
+        """Append the analysis of the trades that follow, made by an analyzer resumed from this one's end state."""
+        self._grow(len(later.outcomes))
+        later._grow(len(self.outcomes))
+        for outcome, later_outcome in zip(self.outcomes, later.outcomes):
+            outcome.merge(later_outcome)
+        for name, code in later.codes.items():
+            if name not in self.codes and self.names[code] is None:
+                self.codes[name] = code
+                self.names[code] = name
+        self.avg_terms = list(later.avg_terms)
+        self.held = later.held
+        if self.timeline is not None and later.timeline is not None:
+            self.timeline.extend(later.timeline)
+
+        if later.head is not None:
+            # Stitch the open interval to the later chunk's first one
+            first_state, before_index, before_timestamp = later.head
+            closed = {state: list(intervals) for state, intervals in later.intervals.items()}
+            if first_state != self.state or closed[first_state]:
+                if first_state == self.state:
+                    # The open interval continues up to the end of the later chunk's first one
+                    first = closed[first_state][0]
+                    closed[first_state][0] = self._interval(
+                        self.state_start, self.state_start_timestamp, first["end_index"], first["end_timestamp"]
+                    )
+                elif self.state is not None:
+                    self.intervals[self.state].append(
+                        self._interval(self.state_start, self.state_start_timestamp, before_index, before_timestamp)
+                    )
+                self.state = later.state
+                self.state_start = later.state_start
+                self.state_start_timestamp = later.state_start_timestamp
+            for state, intervals in closed.items():
+                self.intervals[state].extend(intervals)
+            if self.head is None:
+                self.head = later.head
+
+        # Ties keep the earlier entry, as in a single pass
+        if later.best is not None and (self.best is None or later.best["total_avg_price"] < self.best["total_avg_price"]):
+            self.best = later.best
+        if later.worst is not None and (self.worst is None or later.worst["total_avg_price"] > self.worst["total_avg_price"]):
+            self.worst = later.worst
+
+        if self.first_timestamp is None:
+            self.first_timestamp = later.first_timestamp
+        if later.count > self.count:
+            self.count = later.count
+            self.last_timestamp = later.last_timestamp
+
+    @staticmethod
+    def _interval(start: int, start_timestamp: int, end: int, end_timestamp: int) -> dict:
+        """An interval covering trades start..end (inclusive)."""
+        return {
+            "start_index": start,
+            "end_index": end,
+            "start_timestamp": start_timestamp,
+            "end_timestamp": end_timestamp,
+        }
+
+    def snapshot(self) -> dict:
+        """The analysis of every trade ingested so far; the state is left untouched.
+
+        The results share nothing mutable with the analyzer, so they stay as
+        they are while more trades are ingested.
+        """
+        intervals = {state: list(closed) for state, closed in self.intervals.items()}
+        if self.state is not None:
+            # The open interval runs up to the last trade
+            intervals[self.state].append(
+                self._interval(self.state_start, self.state_start_timestamp, self.count - 1, self.last_timestamp)
+            )
+        if self.count > 1:
+            # The gaps between consecutive trades sum to last - first
+            avg_time_between_trades = (self.last_timestamp - self.first_timestamp) / (self.count - 1) / 60
         else:
-            unprofitable_intervals.append({
-                "start": interval_start,
-                "end": profitability_timeline[-1]["datetime"]
-            })
-    
-    # Find first profitable and first unprofitable moments
-    first_profitable = None
-    first_unprofitable = None
-    
-    for entry in profitability_timeline:
-        if entry["is_profitable"] is True and first_profitable is None:
-            first_profitable = entry["datetime"]
-        if entry["is_profitable"] is False and first_unprofitable is None:
-            first_unprofitable = entry["datetime"]
-    
-    # Additional behavioral insights
-    # Trade frequency analysis
-    trade_times = [datetime.fromtimestamp(t["timestamp"]) for t in trades]
-    time_diffs = [(trade_times[i+1] - trade_times[i]).total_seconds() / 60 for i in range(len(trade_times)-1)]
-    avg_time_between_trades = sum(time_diffs) / len(time_diffs) if time_diffs else 0
-    
-    # Price analysis
-    up_buy_prices = [t["price"] for t in up_buys]
-    up_sell_prices = [t["price"] for t in up_sells]
-    down_buy_prices = [t["price"] for t in down_buys]
-    down_sell_prices = [t["price"] for t in down_sells]
-    
-    # Size analysis
-    up_buy_sizes = [t["size"] for t in up_buys]
-    down_buy_sizes = [t["size"] for t in down_buys]
-    
+            avg_time_between_trades = 0
+
+        labels = outcome_labels(len(self.outcomes))
+        results = {}
+        for label, outcome in zip(labels, self.outcomes):
+            results.update(outcome.results(label))
+        results.update({
+            "outcome_count": len(self.outcomes),
+            "outcomes": list(self.names),
+            "trade_count": self.count,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "profitability_timeline": list(self.timeline) if self.timeline is not None else [],
+            "profitable_intervals": intervals[True],
+            "unprofitable_intervals": intervals[False],
+            "first_profitable": intervals[True][0]["start_timestamp"] if intervals[True] else None,
+            "first_unprofitable": intervals[False][0]["start_timestamp"] if intervals[False] else None,
+            "best_profitable": self.best,
+            "worst_unprofitable": self.worst,
+            "total_realized_pnl": sum(results[f"{label}_realized_pnl"] for label in labels),
+            "avg_time_between_trades": avg_time_between_trades,
+        })
+        return results
+
+
+# Table shared with the pool's workers by analyze_parallel
+_shared_table = None
+
+
+def _share_table(table: TradeTable) -> None:
+    """Pool initializer: keep the table in the worker, so tasks only carry chunk bounds."""
+    global _shared_table
+    _shared_table = table
+
+
+def _chunk_columns(start: int, stop: int):
+    """Per-trade (side, outcome code, size, price) of a chunk of the shared table."""
+    table = _shared_table
+    return zip(table.side[start:stop], table.outcome[start:stop], table.size[start:stop], table.price[start:stop])
+
+
+def _position_deltas(bounds: tuple) -> list:
+    """Net change of each outcome's position over a chunk."""
+    deltas = [0] * _shared_table.outcome_count
+    for side, code, size, _ in _chunk_columns(*bounds):
+        deltas[code] += size if side == BUY else -size
+    return deltas
+
+
+def _cost_maps(task: tuple) -> list:
+    """A chunk's end cost per outcome as (scale, offset) of its start cost.
+
+    Buys add their value and partial sells scale the cost down, so the end
+    cost is scale * start_cost + offset; a sell that empties an outcome resets both.
+    """
+    bounds, positions = task
+    position = list(positions)
+    scale, offset = [1.0] * len(position), [0.0] * len(position)
+    for side, code, size, price in _chunk_columns(*bounds):
+        if side == BUY:
+            offset[code] += size * price
+            position[code] += size
+        else:
+            held = position[code]
+            position[code] -= size
+            if position[code] > 0:
+                kept = 1 - size / held
+                scale[code] *= kept
+                offset[code] *= kept
+            else:
+                scale[code] = offset[code] = 0.0
+    return list(zip(scale, offset))
+
+
+def _analyze_chunk(task: tuple) -> TradeAnalyzer:
+    """Analyze one chunk, resumed from the state the earlier chunks leave."""
+    (start, stop), carry, keep_timeline = task
+    analyzer = TradeAnalyzer.resume(carry, keep_timeline)
+    analyzer.ingest_many(_shared_table.slice(start, stop))
+    return analyzer
+
+
+def analyze_parallel(table: TradeTable, processes: int, keep_timeline: bool = True) -> dict:
+    """Analyze a TradeTable split into one chunk per process.
+
+    Totals, counts and trade lists merge directly, but positions, average
+    costs and intervals depend on every earlier trade, so the chunks' start
+    states are found first, with two cheap parallel passes and a prefix sum:
+    the positions from each chunk's net change, then the costs from each
+    chunk's cost map. Results match a single pass up to float rounding.
+    """
+    step = -(-len(table) // processes)
+    bounds = [(start, min(start + step, len(table))) for start in range(0, len(table), step)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_share_table, initargs=(table,)) as pool:
+        positions = [[0] * table.outcome_count]
+        for deltas in pool.map(_position_deltas, bounds[:-1]):
+            positions.append([position + delta for position, delta in zip(positions[-1], deltas)])
+        costs = [[0] * table.outcome_count]
+        for maps in pool.map(_cost_maps, zip(bounds[:-1], positions)):
+            costs.append([scale * cost + offset for cost, (scale, offset) in zip(costs[-1], maps)])
+        carries = [
+            {
+                "count": start,
+                "last_timestamp": table.timestamp[start - 1] if start else None,
+                "outcomes": list(zip(position, cost)),
+            }
+            for (start, _), position, cost in zip(bounds, positions, costs)
+        ]
+        analyzers = list(pool.map(_analyze_chunk, zip(bounds, carries, repeat(keep_timeline))))
+    analyzer = analyzers[0]
+    for later in analyzers[1:]:
+        analyzer.merge(later)
+    return analyzer.snapshot()
+
+
+def analyze_trades(trades, engine="auto", processes=1, keep_timeline=True):
+    """Perform comprehensive trade analysis.
+
+    trades is a TradeTable, or Trade records / API dicts to build one from.
+    engine is "loop" for a TradeAnalyzer run over every trade, "numpy" for
+    the vectorized engine, or "auto" to use NumPy when it is installed and
+    only one process is allowed. With processes > 1 the loop engine splits
+    large histories across a process pool (see analyze_parallel); None means
+    one per CPU. keep_timeline=False skips the loop engine's per-trade timeline.
+    """
+    table = trades if isinstance(trades, TradeTable) else TradeTable.from_rows(trades)
+    processes = processes or os.cpu_count() or 1
+    if engine == "numpy" or (engine == "auto" and vector_engine is not None and processes <= 1):
+        if vector_engine is None:
+            raise ValueError("the numpy engine needs 'pip install numpy'")
+        return vector_engine.analyze_table(table)
+    processes = min(processes, len(table) // PARALLEL_MIN_CHUNK)
+    if processes > 1:
+        return analyze_parallel(table, processes, keep_timeline)
+    analyzer = TradeAnalyzer(keep_timeline, table.outcome_count)
+    analyzer.ingest_many(table)
+    return analyzer.snapshot()
+
+
+def analyze_markets(markets: dict, engine="auto", processes=1, keep_timeline=True) -> dict:
+    """Analyze every market of partition_by_market's output; returns {conditionId: results}.
+
+    With processes > 1, markets of at least POOL_MIN_MARKET_TRADES trades go
+    to a process pool while the small ones are analyzed here in the meantime.
+    """
+    processes = processes or os.cpu_count() or 1
+    large = [condition_id for condition_id, (_, table) in markets.items() if len(table) >= POOL_MIN_MARKET_TRADES]
+    if processes <= 1 or not large:
+        return {
+            condition_id: analyze_trades(table, engine, keep_timeline=keep_timeline)
+            for condition_id, (_, table) in markets.items()
+        }
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(processes, len(large))) as pool:
+        futures = {
+            condition_id: pool.submit(analyze_trades, markets[condition_id][1], engine, 1, keep_timeline)
+            for condition_id in large
+        }
+        for condition_id, (_, table) in markets.items():
+            if condition_id not in futures:
+                results[condition_id] = analyze_trades(table, engine, keep_timeline=keep_timeline)
+        for condition_id, future in futures.items():
+            results[condition_id] = future.result()
+    return {condition_id: results[condition_id] for condition_id in markets}
+
+
+def current_profitability(results: dict):
+    """True/False when every outcome is held and the average prices sum to under/over $1, else None."""
+    labels = outcome_labels(results['outcome_count'])
+    if not all(results[f'{label}_final_position'] > 0 for label in labels):
+        return None
+    return sum(results[f'{label}_avg_price'] for label in labels) < 1.0
+
+
+def rollup_markets(results_by_market: dict) -> dict:
+    """Event-level totals over the analyses of its markets."""
+    totals = {"cost": 0, "proceeds": 0}
+    for results in results_by_market.values():
+        for label in outcome_labels(results['outcome_count']):
+            totals["cost"] += results[f'{label}_cost_basis']
+            totals["proceeds"] += results[f'{label}_proceeds']
+    markets = list(results_by_market.values())
+    first = [results['first_timestamp'] for results in markets if results['first_timestamp'] is not None]
+    last = [results['last_timestamp'] for results in markets if results['last_timestamp'] is not None]
+    status = [current_profitability(results) for results in markets]
     return {
-        "up_buys": up_buys,
-        "up_sells": up_sells,
-        "down_buys": down_buys,
-        "down_sells": down_sells,
-        "up_shares_bought": up_shares_bought,
-        "up_shares_sold": up_shares_sold,
-        "down_shares_bought": down_shares_bought,
-        "down_shares_sold": down_shares_sold,
-        "up_cost_basis": up_cost_basis,
-        "up_proceeds": up_proceeds,
-        "down_cost_basis": down_cost_basis,
-        "down_proceeds": down_proceeds,
-        "up_final_position": up_final_position,
-        "down_final_position": down_final_position,
-        "up_avg_price": up_avg_price if up_final_position > 0 else 0,
-        "down_avg_price": down_avg_price if down_final_position > 0 else 0,
-        "profitability_timeline": profitability_timeline,
-        "profitable_intervals": profitable_intervals,
-        "unprofitable_intervals": unprofitable_intervals,
-        "first_profitable": first_profitable,
-        "first_unprofitable": first_unprofitable,
-        "up_realized_pnl": up_realized_pnl,
-        "down_realized_pnl": down_realized_pnl,
-        "total_realized_pnl": total_realized_pnl,
-        "avg_time_between_trades": avg_time_between_trades,
-        "up_buy_prices": up_buy_prices,
-        "up_sell_prices": up_sell_prices,
-        "down_buy_prices": down_buy_prices,
-        "down_sell_prices": down_sell_prices,
-        "up_buy_sizes": up_buy_sizes,
-        "down_buy_sizes": down_buy_sizes
+        "markets": len(markets),
+        "trade_count": sum(results['trade_count'] for results in markets),
+        "first_timestamp": min(first) if first else None,
+        "last_timestamp": max(last) if last else None,
+        "total_cost": totals["cost"],
+        "total_proceeds": totals["proceeds"],
+        "net_investment": totals["cost"] - totals["proceeds"],
+        "total_realized_pnl": sum(results['total_realized_pnl'] for results in markets),
+        "profitable_markets": status.count(True),
+        "unprofitable_markets": status.count(False),
+        "unhedged_markets": status.count(None),
     }
 
 
+def print_rollup(rollup: dict) -> None:
+    """Print the event-level totals of rollup_markets."""
+    print("=" * 80)
+    print("EVENT ROLLUP")
+    print("=" * 80)
+    print(f"Markets:                  {rollup['markets']}")
+    print(f"Trades:                   {rollup['trade_count']}")
+    if rollup['first_timestamp'] is not None:
+        print(f"Trading Period:           {format_timestamp(rollup['first_timestamp'])} to {format_timestamp(rollup['last_timestamp'])}")
+    print(f"Total Cost:               ${rollup['total_cost']:.2f}")
+    print(f"Total Proceeds:           ${rollup['total_proceeds']:.2f}")
+    print(f"Net Investment:           ${rollup['net_investment']:.2f}")
+    print(f"Total Realized PnL:       ${rollup['total_realized_pnl']:.2f}")
+    print(
+        f"Hedge Status:             {rollup['profitable_markets']} profitable, "
+        f"{rollup['unprofitable_markets']} not profitable, {rollup['unhedged_markets']} incomplete"
+    )
+    print("=" * 80)
+
+
+def format_interval(interval: dict) -> str:
+    """Render an interval as "start to end (duration)"."""
+    start, end = interval["start_timestamp"], interval["end_timestamp"]
+    duration = timedelta(seconds=end - start)
+    return f"{format_timestamp(start, '%Y-%m-%d %H:%M')} to {format_timestamp(end, '%Y-%m-%d %H:%M')} ({duration})"
+
+
+def accumulation_thirds(sizes: RunningStats) -> tuple:
+    """Average size of the first and of the last third of a side's buys."""
+    count = sizes.count
+    # The buys of sizes[:count // 3] and sizes[-count // 3:]
+    return sizes.mean_between(0, count // 3), sizes.mean_between(count + (-count // 3), count)
+
+
+def print_outcomes(results):
+    """Print the analysis of a market with other than two outcomes, one block per outcome."""
+    labels = outcome_labels(results['outcome_count'])
+    print("=" * 80)
+    print(f"TRADE ANALYSIS ({results['outcome_count']} OUTCOMES)")
+    print("=" * 80)
+    print()
+    
+    for label, name in zip(labels, results['outcomes']):
+        print(f"🎯 OUTCOME: {name or label}")
+        print("-" * 80)
+        print(f"Buys / Sells:            {results[f'{label}_buy_count']} / {results[f'{label}_sell_count']}")
+        print(f"Shares Bought:           {results[f'{label}_shares_bought']:.2f}")
+        print(f"Shares Sold:             {results[f'{label}_shares_sold']:.2f}")
+        print(f"Final Position:          {results[f'{label}_final_position']:.2f}")
+        print(f"Total Cost:              ${results[f'{label}_cost_basis']:.2f}")
+        print(f"Total Proceeds:          ${results[f'{label}_proceeds']:.2f}")
+        if results[f'{label}_final_position'] > 0:
+            print(f"Average Price:           ${results[f'{label}_avg_price']:.4f}")
+        else:
+            print(f"Average Price:           N/A (no position)")
+        prices = results[f'{label}_buy_price_stats']
+        if prices.count:
+            print(f"Buy Prices:              avg ${prices.mean:.4f}, median ${prices.median:.4f}, min ${prices.min:.4f}, max ${prices.max:.4f}")
+        print(f"Realized PnL:            ${results[f'{label}_realized_pnl']:.2f}")
+        print()
+    
+    print("📅 PROFITABILITY TIMELINE (sum of average prices < $1.00 while holding every outcome)")
+    print("-" * 80)
+    print(f"Profitable Intervals:    {len(results['profitable_intervals'])}")
+    for i, interval in enumerate(results['profitable_intervals'], 1):
+        print(f"  {i}. {format_interval(interval)}")
+    print(f"Unprofitable Intervals:  {len(results['unprofitable_intervals'])}")
+    for i, interval in enumerate(results['unprofitable_intervals'], 1):
+        print(f"  {i}. {format_interval(interval)}")
+    print()
+    print(f"Total Realized PnL:      ${results['total_realized_pnl']:.2f}")
+    print(f"Average Time Between Trades: {results['avg_time_between_trades']:.1f} minutes")
+    print()
+    print("=" * 80)
+
+
 def print_analysis(results):
     """Print comprehensive analysis results."""
+    if results['outcome_count'] != 2:
+        print_outcomes(results)
+        return
     
     print("=" * 80)
     print("COMPREHENSIVE TRADE ANALYSIS")
@@ -262,10 +708,10 @@ def print_analysis(results):
     # Basic Statistics
     print("📊 BASIC STATISTICS")
     print("-" * 80)
-    print(f"Total YES (Up) Buys:     {len(results['up_buys'])}")
-    print(f"Total YES (Up) Sells:    {len(results['up_sells'])}")
-    print(f"Total NO (Down) Buys:    {len(results['down_buys'])}")
-    print(f"Total NO (Down) Sells:   {len(results['down_sells'])}")
+    print(f"Total YES (Up) Buys:     {results['up_buy_count']}")
+    print(f"Total YES (Up) Sells:    {results['up_sell_count']}")
+    print(f"Total NO (Down) Buys:    {results['down_buy_count']}")
+    print(f"Total NO (Down) Sells:   {results['down_sell_count']}")
     print()
     
     # Shares Analysis
@@ -317,27 +763,25 @@ def print_analysis(results):
     # Profitability Timeline
     print("📅 PROFITABILITY TIMELINE")
     print("-" * 80)
-    if results['first_profitable']:
-        print(f"First Became Profitable: {results['first_profitable'].strftime('%Y-%m-%d %H:%M:%S')}")
+    if results['first_profitable'] is not None:
+        print(f"First Became Profitable: {format_timestamp(results['first_profitable'])}")
     else:
         print("First Became Profitable: Never")
     
-    if results['first_unprofitable']:
-        print(f"First Became Unprofitable: {results['first_unprofitable'].strftime('%Y-%m-%d %H:%M:%S')}")
+    if results['first_unprofitable'] is not None:
+        print(f"First Became Unprofitable: {format_timestamp(results['first_unprofitable'])}")
     else:
         print("First Became Unprofitable: Never")
     print()
     
     print(f"Profitable Intervals:    {len(results['profitable_intervals'])}")
     for i, interval in enumerate(results['profitable_intervals'], 1):
-        duration = interval['end'] - interval['start']
-        print(f"  {i}. {interval['start'].strftime('%Y-%m-%d %H:%M')} to {interval['end'].strftime('%Y-%m-%d %H:%M')} ({duration})")
+        print(f"  {i}. {format_interval(interval)}")
     print()
     
     print(f"Unprofitable Intervals:  {len(results['unprofitable_intervals'])}")
     for i, interval in enumerate(results['unprofitable_intervals'], 1):
-        duration = interval['end'] - interval['start']
-        print(f"  {i}. {interval['start'].strftime('%Y-%m-%d %H:%M')} to {interval['end'].strftime('%Y-%m-%d %H:%M')} ({duration})")
+        print(f"  {i}. {format_interval(interval)}")
     print()
     
     # PnL Analysis
@@ -354,53 +798,41 @@ def print_analysis(results):
     print(f"Average Time Between Trades: {results['avg_time_between_trades']:.1f} minutes")
     print()
     
-    if results['up_buy_prices']:
-        print(f"YES Buy Prices:")
-        print(f"  Average: ${sum(results['up_buy_prices'])/len(results['up_buy_prices']):.4f}")
-        print(f"  Min:     ${min(results['up_buy_prices']):.4f}")
-        print(f"  Max:     ${max(results['up_buy_prices']):.4f}")
-    
-    if results['up_sell_prices']:
-        print(f"YES Sell Prices:")
-        print(f"  Average: ${sum(results['up_sell_prices'])/len(results['up_sell_prices']):.4f}")
-        print(f"  Min:     ${min(results['up_sell_prices']):.4f}")
-        print(f"  Max:     ${max(results['up_sell_prices']):.4f}")
-    
-    if results['down_buy_prices']:
-        print(f"NO Buy Prices:")
-        print(f"  Average: ${sum(results['down_buy_prices'])/len(results['down_buy_prices']):.4f}")
-        print(f"  Min:     ${min(results['down_buy_prices']):.4f}")
-        print(f"  Max:     ${max(results['down_buy_prices']):.4f}")
-    
-    if results['down_sell_prices']:
-        print(f"NO Sell Prices:")
-        print(f"  Average: ${sum(results['down_sell_prices'])/len(results['down_sell_prices']):.4f}")
-        print(f"  Min:     ${min(results['down_sell_prices']):.4f}")
-        print(f"  Max:     ${max(results['down_sell_prices']):.4f}")
+    for label, key in (
+        ("YES Buy Prices", "up_buy_price_stats"),
+        ("YES Sell Prices", "up_sell_price_stats"),
+        ("NO Buy Prices", "down_buy_price_stats"),
+        ("NO Sell Prices", "down_sell_price_stats"),
+    ):
+        stats = results[key]
+        if stats.count:
+            print(f"{label}:")
+            print(f"  Average: ${stats.mean:.4f}")
+            print(f"  Median:  ${stats.median:.4f}")
+            print(f"  Min:     ${stats.min:.4f}")
+            print(f"  Max:     ${stats.max:.4f}")
     print()
     
-    if results['up_buy_sizes']:
-        print(f"YES Buy Sizes:")
-        print(f"  Average: {sum(results['up_buy_sizes'])/len(results['up_buy_sizes']):.2f}")
-        print(f"  Min:     {min(results['up_buy_sizes']):.2f}")
-        print(f"  Max:     {max(results['up_buy_sizes']):.2f}")
-    
-    if results['down_buy_sizes']:
-        print(f"NO Buy Sizes:")
-        print(f"  Average: {sum(results['down_buy_sizes'])/len(results['down_buy_sizes']):.2f}")
-        print(f"  Min:     {min(results['down_buy_sizes']):.2f}")
-        print(f"  Max:     {max(results['down_buy_sizes']):.2f}")
+    for label, key in (("YES Buy Sizes", "up_buy_size_stats"), ("NO Buy Sizes", "down_buy_size_stats")):
+        stats = results[key]
+        if stats.count:
+            print(f"{label}:")
+            print(f"  Average: {stats.mean:.2f}")
+            print(f"  Median:  {stats.median:.2f}")
+            print(f"  P95:     {stats.quantile(0.95):.2f}")
+            print(f"  Min:     {stats.min:.2f}")
+            print(f"  Max:     {stats.max:.2f}")
     print()
     
     # Trading Pattern Analysis
     print("📊 TRADING PATTERNS")
     print("-" * 80)
-    total_trades = len(results['up_buys']) + len(results['up_sells']) + len(results['down_buys']) + len(results['down_sells'])
-    buy_ratio = (len(results['up_buys']) + len(results['down_buys'])) / total_trades * 100 if total_trades > 0 else 0
-    sell_ratio = (len(results['up_sells']) + len(results['down_sells'])) / total_trades * 100 if total_trades > 0 else 0
+    total_trades = results['up_buy_count'] + results['up_sell_count'] + results['down_buy_count'] + results['down_sell_count']
+    buy_ratio = (results['up_buy_count'] + results['down_buy_count']) / total_trades * 100 if total_trades > 0 else 0
+    sell_ratio = (results['up_sell_count'] + results['down_sell_count']) / total_trades * 100 if total_trades > 0 else 0
     
     print(f"Buy/Sell Ratio:          {buy_ratio:.1f}% buys / {sell_ratio:.1f}% sells")
-    print(f"YES/NO Ratio:            {len(results['up_buys']) + len(results['up_sells'])} YES / {len(results['down_buys']) + len(results['down_sells'])} NO")
+    print(f"YES/NO Ratio:            {results['up_buy_count'] + results['up_sell_count']} YES / {results['down_buy_count'] + results['down_sell_count']} NO")
     print()
     
     # Additional insights - Enhanced detailed analysis
@@ -445,10 +877,10 @@ def print_analysis(results):
     print("⏱️  PROFITABILITY TIMELINE ANALYSIS")
     if results['profitable_intervals']:
         total_profitable_time = sum(
-            (interval['end'] - interval['start']).total_seconds() / 3600 
+            (interval['end_timestamp'] - interval['start_timestamp']) / 3600
             for interval in results['profitable_intervals']
         )
-        total_time = (results['profitability_timeline'][-1]['datetime'] - results['profitability_timeline'][0]['datetime']).total_seconds() / 3600
+        total_time = (results['last_timestamp'] - results['first_timestamp']) / 3600
         profitable_pct = (total_profitable_time / total_time * 100) if total_time > 0 else 0
         unprofitable_pct = 100 - profitable_pct
         
@@ -457,20 +889,18 @@ def print_analysis(results):
         print(f"Time Unprofitable:       {unprofitable_pct:.2f}% ({total_time - total_profitable_time:.2f} hours)")
         
         # Find best and worst profitability moments
-        profitable_entries = [e for e in results['profitability_timeline'] if e['is_profitable'] is True]
-        unprofitable_entries = [e for e in results['profitability_timeline'] if e['is_profitable'] is False]
+        best_entry = results['best_profitable']
+        worst_entry = results['worst_unprofitable']
         
-        if profitable_entries:
-            best_entry = min(profitable_entries, key=lambda x: x['total_avg_price'])
-            print(f"Best Profitability:      ${best_entry['total_avg_price']:.4f} at {best_entry['datetime'].strftime('%Y-%m-%d %H:%M:%S')}")
+        if best_entry:
+            print(f"Best Profitability:      ${best_entry['total_avg_price']:.4f} at {format_timestamp(best_entry['timestamp'])}")
             print(f"  - YES Avg:            ${best_entry['up_avg_price']:.4f}")
             print(f"  - NO Avg:             ${best_entry['down_avg_price']:.4f}")
             print(f"  - YES Shares:         {best_entry['up_position']:.2f}")
             print(f"  - NO Shares:          {best_entry['down_position']:.2f}")
         
-        if unprofitable_entries:
-            worst_entry = max(unprofitable_entries, key=lambda x: x['total_avg_price'])
-            print(f"Worst Profitability:     ${worst_entry['total_avg_price']:.4f} at {worst_entry['datetime'].strftime('%Y-%m-%d %H:%M:%S')}")
+        if worst_entry:
+            print(f"Worst Profitability:     ${worst_entry['total_avg_price']:.4f} at {format_timestamp(worst_entry['timestamp'])}")
             print(f"  - YES Avg:            ${worst_entry['up_avg_price']:.4f}")
             print(f"  - NO Avg:             ${worst_entry['down_avg_price']:.4f}")
             print(f"  - YES Shares:         {worst_entry['up_position']:.2f}")
@@ -528,9 +958,10 @@ def print_analysis(results):
     print(f"  - Interpretation:       {intensity_desc}")
     
     # Trade size patterns
-    if results['up_buy_sizes'] and results['down_buy_sizes']:
-        up_avg_size = sum(results['up_buy_sizes']) / len(results['up_buy_sizes'])
-        down_avg_size = sum(results['down_buy_sizes']) / len(results['down_buy_sizes'])
+    up_sizes, down_sizes = results['up_buy_size_stats'], results['down_buy_size_stats']
+    if up_sizes.count and down_sizes.count:
+        up_avg_size = up_sizes.mean
+        down_avg_size = down_sizes.mean
         size_ratio = down_avg_size / up_avg_size if up_avg_size > 0 else 0
         
         print(f"Average Trade Size:")
@@ -539,8 +970,8 @@ def print_analysis(results):
         print(f"  - Size Ratio (NO/YES): {size_ratio:.2f}x (NO trades {size_ratio:.1f}x larger on average)")
         
         # Size consistency
-        up_size_std = (sum((x - up_avg_size)**2 for x in results['up_buy_sizes']) / len(results['up_buy_sizes']))**0.5
-        down_size_std = (sum((x - down_avg_size)**2 for x in results['down_buy_sizes']) / len(results['down_buy_sizes']))**0.5
+        up_size_std = up_sizes.std
+        down_size_std = down_sizes.std
         
         up_cv = (up_size_std / up_avg_size * 100) if up_avg_size > 0 else 0
         down_cv = (down_size_std / down_avg_size * 100) if down_avg_size > 0 else 0
@@ -551,14 +982,14 @@ def print_analysis(results):
     
     # Strategy assessment
     print("🧠 STRATEGY ANALYSIS")
-    total_buys = len(results['up_buys']) + len(results['down_buys'])
-    yes_buy_pct = (len(results['up_buys']) / total_buys * 100) if total_buys > 0 else 0
-    no_buy_pct = (len(results['down_buys']) / total_buys * 100) if total_buys > 0 else 0
+    total_buys = results['up_buy_count'] + results['down_buy_count']
+    yes_buy_pct = (results['up_buy_count'] / total_buys * 100) if total_buys > 0 else 0
+    no_buy_pct = (results['down_buy_count'] / total_buys * 100) if total_buys > 0 else 0
     
-    if len(results['up_buys']) > len(results['down_buys']) * 2:
+    if results['up_buy_count'] > results['down_buy_count'] * 2:
         strategy = "YES-FOCUSED"
         strategy_desc = f"Trader prefers YES side ({yes_buy_pct:.1f}% YES trades vs {no_buy_pct:.1f}% NO trades)"
-    elif len(results['down_buys']) > len(results['up_buys']) * 2:
+    elif results['down_buy_count'] > results['up_buy_count'] * 2:
         strategy = "NO-FOCUSED"
         strategy_desc = f"Trader prefers NO side ({no_buy_pct:.1f}% NO trades vs {yes_buy_pct:.1f}% YES trades)"
     else:
@@ -579,11 +1010,12 @@ def print_analysis(results):
             print(f"  - Position Imbalance:   LOW ({imbalance:.1f}% difference) - Well-balanced hedge")
     
     # Entry timing analysis
-    if results['up_buy_prices'] and results['down_buy_prices']:
-        up_first_price = results['up_buy_prices'][0] if results['up_buy_prices'] else 0
-        up_last_price = results['up_buy_prices'][-1] if results['up_buy_prices'] else 0
-        down_first_price = results['down_buy_prices'][0] if results['down_buy_prices'] else 0
-        down_last_price = results['down_buy_prices'][-1] if results['down_buy_prices'] else 0
+    up_prices, down_prices = results['up_buy_price_stats'], results['down_buy_price_stats']
+    if up_prices.count and down_prices.count:
+        up_first_price = up_prices.first
+        up_last_price = up_prices.last
+        down_first_price = down_prices.first
+        down_last_price = down_prices.last
         
         up_price_change = ((up_last_price - up_first_price) / up_first_price * 100) if up_first_price > 0 else 0
         down_price_change = ((down_last_price - down_first_price) / down_first_price * 100) if down_first_price > 0 else 0
@@ -627,12 +1059,9 @@ def print_analysis(results):
     print("🔍 TRADING PATTERN INSIGHTS")
     
     # Check for accumulation patterns
-    if len(results['up_buys']) > 50:
+    if results['up_buy_count'] > 50:
         # Analyze if trader accumulates over time
-        early_up_buys = results['up_buys'][:len(results['up_buys'])//3]
-        late_up_buys = results['up_buys'][-len(results['up_buys'])//3:]
-        early_up_avg = sum(t['size'] for t in early_up_buys) / len(early_up_buys) if early_up_buys else 0
-        late_up_avg = sum(t['size'] for t in late_up_buys) / len(late_up_buys) if late_up_buys else 0
+        early_up_avg, late_up_avg = accumulation_thirds(up_sizes)
         
         if late_up_avg > early_up_avg * 1.5:
             print(f"  - YES Accumulation:    INCREASING (late trades {late_up_avg/early_up_avg:.1f}x larger)")
@@ -641,11 +1070,8 @@ def print_analysis(results):
         else:
             print(f"  - YES Accumulation:    STEADY (consistent sizing)")
     
-    if len(results['down_buys']) > 20:
-        early_down_buys = results['down_buys'][:len(results['down_buys'])//3]
-        late_down_buys = results['down_buys'][-len(results['down_buys'])//3:]
-        early_down_avg = sum(t['size'] for t in early_down_buys) / len(early_down_buys) if early_down_buys else 0
-        late_down_avg = sum(t['size'] for t in late_down_buys) / len(late_down_buys) if late_down_buys else 0
+    if results['down_buy_count'] > 20:
+        early_down_avg, late_down_avg = accumulation_thirds(down_sizes)
         
         if late_down_avg > early_down_avg * 1.5:
             print(f"  - NO Accumulation:     INCREASING (late trades {late_down_avg/early_down_avg:.1f}x larger)")
@@ -655,8 +1081,8 @@ def print_analysis(results):
             print(f"  - NO Accumulation:     STEADY (consistent sizing)")
     
     # Price chasing analysis
-    if results['up_buy_prices']:
-        up_price_trend = results['up_buy_prices'][-1] - results['up_buy_prices'][0]
+    if up_prices.count:
+        up_price_trend = up_prices.last - up_prices.first
         if up_price_trend > 0.05:
             print(f"  - YES Price Trend:      CHASING HIGHER (bought at higher prices over time)")
         elif up_price_trend < -0.05:
@@ -664,8 +1090,8 @@ def print_analysis(results):
         else:
             print(f"  - YES Price Trend:      NEUTRAL (no clear trend)")
     
-    if results['down_buy_prices']:
-        down_price_trend = results['down_buy_prices'][-1] - results['down_buy_prices'][0]
+    if down_prices.count:
+        down_price_trend = down_prices.last - down_prices.first
         if down_price_trend > 0.05:
             print(f"  - NO Price Trend:       CHASING HIGHER (bought at higher prices over time)")
         elif down_price_trend < -0.05:
@@ -677,51 +1103,88 @@ def print_analysis(results):
     print("=" * 80)
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Analyze a trades JSON file written by fetch_trades.py; event files are analyzed market by market.",
+    )
+    parser.add_argument("input_file", nargs="?", default="visualization/trades.json", help="trades file (default: visualization/trades.json)")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_OUTPUT, metavar="FILE", help=f"save detailed results as JSON (default file: {DEFAULT_OUTPUT})")
+    parser.add_argument("--engine", choices=("auto", "loop", "numpy"), default="auto", help="analysis engine (default: auto)")
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="processes for large histories and markets, 0 for one per CPU (default: 1)",
+    )
+    return parser.parse_args(argv)
+
+
+def export_results(results: dict) -> dict:
+    """Analysis results ready to save as JSON."""
+    # Add readable times next to the epoch seconds
+    export_data = results.copy()
+    export_data['profitability_timeline'] = [
+        {"timestamp": entry["timestamp"], "datetime": format_timestamp(entry["timestamp"]), **entry}
+        for entry in export_data['profitability_timeline']
+    ]
+    for key in ('profitable_intervals', 'unprofitable_intervals'):
+        export_data[key] = [
+            {
+                "start": format_timestamp(interval["start_timestamp"]),
+                "end": format_timestamp(interval["end_timestamp"]),
+                **interval,
+            }
+            for interval in export_data[key]
+        ]
+    for key in ('first_profitable', 'first_unprofitable'):
+        export_data[key] = format_timestamp(export_data[key]) if export_data[key] is not None else None
+    for key, value in results.items():
+        if isinstance(value, RunningStats):
+            export_data[key] = value.summary()
+    return export_data
+
+
 def main():
     """Main function."""
-    input_file = sys.argv[1] if len(sys.argv) > 1 else "visualization/trades.json"
+    args = parse_args()
+    input_file = args.input_file
     
     print(f"Loading trades from {input_file}...")
-    trades = load_trades(input_file)
-    print(f"Loaded {len(trades)} trades")
+    markets = load_trades(input_file, by_market=True)
+    print(f"Loaded {sum(len(table) for _, table in markets.values())} trades")
     print()
     
-    print("Analyzing trades...")
-    results = analyze_trades(trades)
-    
-    print_analysis(results)
+    # The timeline is only exported, never printed
+    keep_timeline = args.save is not None
+    if len(markets) <= 1:
+        print("Analyzing trades...")
+        _, trades = next(iter(markets.values()), (None, TradeTable()))
+        results = analyze_trades(trades, args.engine, args.processes, keep_timeline=keep_timeline)
+        print_analysis(results)
+        export_data = export_results(results) if keep_timeline else None
+    else:
+        # An event file: each market has its own positions, so analyze them apart
+        print(f"Analyzing {len(markets)} markets separately...")
+        results_by_market = analyze_markets(markets, args.engine, args.processes, keep_timeline)
+        for condition_id, results in results_by_market.items():
+            title = markets[condition_id][0] or "Unknown Market"
+            print()
+            print(f"MARKET: {title} ({condition_id})")
+            print_analysis(results)
+        rollup = rollup_markets(results_by_market)
+        print()
+        print_rollup(rollup)
+        export_data = {
+            "markets": {
+                str(condition_id): {"title": markets[condition_id][0], **export_results(results)}
+                for condition_id, results in results_by_market.items()
+            },
+            "event": rollup,
+        } if keep_timeline else None
     
     # Optionally save detailed results to JSON
-    if len(sys.argv) > 2 and sys.argv[2] == "--save":
-        output_file = sys.argv[3] if len(sys.argv) > 3 else "visualization/analysis_results.json"
-        # Convert datetime objects to strings for JSON serialization
-        export_data = results.copy()
-        export_data['profitability_timeline'] = [
-            {k: (v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v) 
-             for k, v in entry.items()} 
-            for entry in export_data['profitability_timeline']
-        ]
-        export_data['profitable_intervals'] = [
-            {k: v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v 
-             for k, v in interval.items()} 
-            for interval in export_data['profitable_intervals']
-        ]
-        export_data['unprofitable_intervals'] = [
-            {k: v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v 
-             for k, v in interval.items()} 
-            for interval in export_data['unprofitable_intervals']
-        ]
-        export_data['first_profitable'] = export_data['first_profitable'].strftime('%Y-%m-%d %H:%M:%S') if export_data['first_profitable'] else None
-        export_data['first_unprofitable'] = export_data['first_unprofitable'].strftime('%Y-%m-%d %H:%M:%S') if export_data['first_unprofitable'] else None
-        
-        # Remove trade objects (too large)
-        export_data.pop('up_buys', None)
-        export_data.pop('up_sells', None)
-        export_data.pop('down_buys', None)
-        export_data.pop('down_sells', None)
-        
-        with open(output_file, "w") as f:
-            json.dump(export_data, f, indent=2)
+    if export_data is not None:
+        output_file = args.save
+        save_file(output_file, export_data)
         print(f"\nDetailed results saved to {output_file}")
 
 
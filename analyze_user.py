@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """
 One-command tool: Fetch trades and analyze them automatically.
-Usage: python3 analyze_user.py "<market_query>" <user_address> [output_file]
+Usage: python3 analyze_user.py "<market_query>" <user_address> [output_file] [--store [PATH]] [--search-cache [PATH]]
 """
 
 import sys
+import argparse
 import subprocess
 import os
 from pathlib import Path
@@ -26,23 +27,48 @@ def check_dependencies():
         sys.exit(1)
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fetch a user's trades for an event and analyze them.",
+        epilog=(
+            "Example:\n"
+            '  python3 analyze_user.py "Solana Up or Down on February 5?" 0x4ee29e4e7d4c380babeae5e22e5c02400c2246e1\n'
+            "\nNote: Make sure to install dependencies first:\n"
+            "  pip3 install -r requirements.txt"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("market_query", help="search query used to find the event")
+    parser.add_argument("user_address", help="wallet address of the trader")
+    parser.add_argument("output_file", nargs="?", default="visualization/trades.json", help="where to save the trades")
+    parser.add_argument(
+        "--store", nargs="?", const="", default=None, metavar="PATH",
+        help="reuse trades stored by earlier runs and only fetch newer ones",
+    )
+    parser.add_argument(
+        "--search-cache", nargs="?", const="", default=None, metavar="PATH",
+        help="cache market searches on disk instead of searching on every run",
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """Main function - fetch trades and analyze them."""
     
     # Check dependencies first
     check_dependencies()
     
-    if len(sys.argv) < 3:
-        print("Usage: python3 analyze_user.py \"<market_query>\" <user_address> [output_file]")
-        print("\nExample:")
-        print('  python3 analyze_user.py "Solana Up or Down on February 5?" 0x4ee29e4e7d4c380babeae5e22e5c02400c2246e1')
-        print("\nNote: Make sure to install dependencies first:")
-        print("  pip3 install -r requirements.txt")
-        sys.exit(1)
-    
-    market_query = sys.argv[1]
-    user_address = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else "visualization/trades.json"
+    args = parse_args()
+    market_query = args.market_query
+    user_address = args.user_address
+    output_file = args.output_file
+
+    fetch_options = []
+    if args.store is not None:
+        fetch_options += ["--store"] + ([args.store] if args.store else [])
+    if args.search_cache is not None:
+        fetch_options += ["--search-cache"] + ([args.search_cache] if args.search_cache else [])
     
     # Ensure output directory exists
     output_path = Path(output_file)
@@ -67,7 +93,7 @@ def main():
         market_query,
         user_address,
         output_file
-    ]
+    ] + fetch_options
     
     try:
         result = subprocess.run(fetch_cmd, check=True, capture_output=True, text=True)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Fetch and save Polymarket trades for many users on the same event.
+The event is searched once and every (market, user) pair is fetched through
+one shared, rate-limited HTTP client.
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from collections import defaultdict
+
+from fetch_trades import (
+    add_fetch_options,
+    configure_client,
+    describe_report,
+    find_event,
+    iter_jobs_as_completed,
+    spool_trades,
+    write_merged_trades,
+)
+from trade_store import TradeStore
+
+DEFAULT_OUTPUT_DIR = "batch_trades"
+
+
+def read_addresses(items: list) -> list:
+    """Expand the command line users: each item is an address or a file of addresses.
+
+    Files hold one address per line; blank lines and lines starting with # are
+    ignored. Duplicates are dropped, keeping the first occurrence.
+    """
+    addresses = []
+    for item in items:
+        if os.path.isfile(item):
+            with open(item, "r") as f:
+                addresses.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        else:
+            addresses.extend(a.strip() for a in item.split(",") if a.strip())
+    return list(dict.fromkeys(addresses))
+
+
+def output_path(output_dir: str, user_address: str, ndjson: bool = False) -> str:
+    """Where a user's trades are written inside output_dir."""
+    return os.path.join(output_dir, f"trades_{user_address}.{'ndjson' if ndjson else 'json'}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fetch and save Polymarket trades for many users across an event's markets.",
+        epilog="Example:\n  python batch_fetch.py 'Solana Up or Down on February 5?' wallets.txt 0x1234... --output-dir out",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("market_query", help="search query used to find the event")
+    parser.add_argument(
+        "users", nargs="+",
+        help="wallet addresses (comma separated allowed) or files with one address per line",
+    )
+    parser.add_argument(
+        "--output-dir", default=DEFAULT_OUTPUT_DIR,
+        help=f"directory for the per-user trade files (default: {DEFAULT_OUTPUT_DIR})",
+    )
+    add_fetch_options(parser)
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function to fetch and save trades for every user."""
+    args = parse_args()
+    users = read_addresses(args.users)
+    if not users:
+        print("Error: No user addresses given.", file=sys.stderr)
+        sys.exit(1)
+    configure_client(args)
+
+    event, markets = find_event(args.market_query, args.search_cache)
+    if not event or not markets:
+        print("Error: No market found for that query.", file=sys.stderr)
+        sys.exit(1)
+
+    markets = [m for m in markets if m.get("conditionId")]
+    print(f"\nFound event: {event.get('title', 'Unknown Event')}")
+    print(f"Fetching {len(markets)} sub-markets for {len(users)} users ({len(markets) * len(users)} jobs)...\n")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [(market, user) for user in users for market in markets]
+    remaining = defaultdict(int)
+    for _, user in jobs:
+        remaining[user] += 1
+
+    store = TradeStore(args.store) if args.store else None
+    saved = 0
+    with tempfile.TemporaryDirectory(prefix="batch-fetch-") as spool_dir:
+        # Spools per user, keyed by job index so markets merge in search order
+        spools = defaultdict(dict)
+        try:
+            for idx, market, user, trades, report in iter_jobs_as_completed(
+                jobs, max_workers=args.workers, store=store,
+                page_workers=args.page_workers, pagination=args.pagination,
+            ):
+                if trades or report["error"]:
+                    print(f"{user} / {market.get('question') or market['conditionId']}: {describe_report(report)}")
+                if trades:
+                    spools[user][idx] = spool_trades(trades, spool_dir)
+
+                # Write each user's file as soon as all of their markets are in
+                remaining[user] -= 1
+                if remaining[user] == 0 and spools[user]:
+                    user_spools = spools.pop(user)
+                    path = output_path(args.output_dir, user, args.ndjson)
+                    try:
+                        count = write_merged_trades([user_spools[i] for i in sorted(user_spools)], path, ndjson=args.ndjson)
+                    except IOError as exc:
+                        print(f"Error writing to file: {exc}", file=sys.stderr)
+                        sys.exit(1)
+                    for spool in user_spools.values():
+                        os.unlink(spool)
+                    print(f"Saved {count} trades for {user} to {path}")
+                    saved += 1
+        finally:
+            if store is not None:
+                store.close()
+
+    print(f"\nSaved trade files for {saved} of {len(users)} users in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark analyze_trades on a synthetic worst case for interval detection.
+Usage: python3 bench_analysis.py [--trades N] [--repeat R]
+"""
+
+import argparse
+
+from analyze_trades import analyze_trades, vector_engine
+from bench_serialization import best_time
+from trade_records import TradeTable
+
+DEFAULT_TRADES = 200_000
+DEFAULT_REPEAT = 3
+
+
+def choppy_trades(count: int) -> list:
+    """A hedged trader whose profitability flips every other trade.
+
+    NO is held at $0.45 throughout, while the whole YES position is sold and
+    bought back alternately at $0.30 and $0.80, so YES+NO swings across $1.
+    """
+    trades = [{"timestamp": 1_700_000_000, "side": "BUY", "outcome": "Down", "size": 100.0, "price": 0.45}]
+    for i in range(1, count):
+        if i % 2:
+            price = 0.3 if (i // 2) % 2 == 0 else 0.8
+            trade = {"side": "BUY", "outcome": "Up", "size": 100.0, "price": price}
+        else:
+            trade = {"side": "SELL", "outcome": "Up", "size": 100.0, "price": 0.5}
+        trades.append(dict(trade, timestamp=1_700_000_000 + i))
+    return trades
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Time analyze_trades on a history that flips profitability constantly.")
+    parser.add_argument("--trades", type=int, default=DEFAULT_TRADES, help=f"trades in the history (default: {DEFAULT_TRADES})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"runs per measurement (default: {DEFAULT_REPEAT})")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function - time every available engine on the choppy history."""
+    args = parse_args()
+    table = TradeTable.from_rows(choppy_trades(args.trades))
+    engines = ["loop"] + (["numpy"] if vector_engine is not None else [])
+
+    results = analyze_trades(table, engine="loop")
+    flips = len(results["profitable_intervals"]) + len(results["unprofitable_intervals"])
+    print(f"{len(table)} trades, {flips} profitability intervals\n")
+    for engine in engines:
+        elapsed = best_time(lambda: analyze_trades(table, engine=engine), args.repeat)
+        print(f"{engine:<6}  {elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
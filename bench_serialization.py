@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSON backends on a synthetic trades file.
+Usage: python3 bench_serialization.py [--trades N] [--repeat R]
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import serialization
+
+DEFAULT_TRADES = 1_000_000
+DEFAULT_REPEAT = 3
+
+
+def synthetic_trades(count: int, seed: int = 0) -> list:
+    """Trades shaped like the /trades API rows, oldest first."""
+    rng = random.Random(seed)
+    timestamp = 1_700_000_000
+    trades = []
+    for i in range(count):
+        timestamp += rng.randint(0, 30)
+        outcome_index = rng.randint(0, 1)
+        trades.append({
+            "proxyWallet": f"0x{rng.getrandbits(160):040x}",
+            "side": rng.choice(("BUY", "SELL")),
+            "asset": str(rng.getrandbits(250)),
+            "conditionId": "0x" + "ab" * 32,
+            "size": round(rng.uniform(1, 500), 2),
+            "price": round(rng.uniform(0.01, 0.99), 4),
+            "timestamp": timestamp,
+            "title": "Bitcoin Up or Down on February 5?",
+            "slug": "bitcoin-up-or-down-on-february-5",
+            "outcome": ("Up", "Down")[outcome_index],
+            "outcomeIndex": outcome_index,
+            "transactionHash": f"0x{rng.getrandbits(256):064x}",
+        })
+    return trades
+
+
+def best_time(func, repeat: int) -> float:
+    """Fastest of repeat runs of func, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare the installed JSON backends on synthetic trades.")
+    parser.add_argument("--trades", type=int, default=DEFAULT_TRADES, help=f"trades in the file (default: {DEFAULT_TRADES})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"runs per measurement (default: {DEFAULT_REPEAT})")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function - time loading, compact encoding and indented export per backend."""
+    args = parse_args()
+    print(f"Generating {args.trades} synthetic trades...")
+    trades = synthetic_trades(args.trades)
+
+    with tempfile.TemporaryDirectory(prefix="bench-serialization-") as tmp_dir:
+        path = os.path.join(tmp_dir, "trades.json")
+        serialization.set_backend("json")
+        serialization.save_file(path, trades, indent=False)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"File size: {size_mb:.1f} MB\n")
+
+        print(f"{'Backend':<10}  {'load_file':>10}  {'dumps/trade':>12}  {'save_file':>10}")
+        for name in serialization.available_backends():
+            serialization.set_backend(name)
+            load = best_time(lambda: serialization.load_file(path), args.repeat)
+            encode = best_time(lambda: [serialization.dumps(t) for t in trades], args.repeat)
+            export = best_time(lambda: serialization.save_file(os.path.join(tmp_dir, f"out-{name}.json"), trades), args.repeat)
+            print(f"{name:<10}  {load:>9.2f}s  {encode:>11.2f}s  {export:>9.2f}s")
+    serialization.set_backend()
+
+
+if __name__ == "__main__":
+    main()
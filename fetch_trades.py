@@ -3,23 +3,213 @@
 Simple script to fetch and save Polymarket trades for a user and market.
 """
 
+import os
 import sys
-import json
+import time
+import heapq
+import random
+import argparse
+import tempfile
+import threading
 import requests
-from typing import Optional, Tuple
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, Optional, Tuple
+from market_cache import DEFAULT_CACHE_FILE, MarketCache
+from serialization import DECODE_ERRORS, dumps, loads
+from trade_store import DEFAULT_STORE_FILE, TradeStore, trade_key
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 support is optional
+    httpx = None
 
 SEARCH_URL = "https://gamma-api.polymarket.com/public-search"
 TRADES_URL = "https://data-api.polymarket.com/trades"
 DEFAULT_OUTPUT_FILE = "trades.json"
+DEFAULT_MAX_WORKERS = 8
+# Pages of a single market fetched at once when the total count is known
+DEFAULT_PAGE_WORKERS = 4
+# Safety limit to prevent infinite pagination loops
+MAX_PAGES = 1000
+# Windows a full time shard is split into, and the limit on shard requests
+SHARD_SPLIT = 4
+MAX_SHARD_REQUESTS = 20000
+# Smaller pages when only the trades since the last run are wanted
+INCREMENTAL_PAGE_LIMIT = 200
+
+# Requests per second across all workers (0 disables the limit)
+DEFAULT_RATE_LIMIT = 10.0
+# Retries per request for connection errors, 429 and 5xx responses
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+MAX_RETRY_AFTER = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Errors raised by any of the supported HTTP clients or by decoding a malformed body
+REQUEST_ERRORS = (requests.RequestException,) + DECODE_ERRORS + ((httpx.HTTPError,) if httpx else ())
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_MAX_WORKERS, http2: bool = False):
+    """Create an HTTP client that keeps connections alive between requests.
+
+    The pool holds enough connections for pool_size concurrent requests. Both
+    clients ask for gzip-compressed responses. With http2=True an httpx client
+    is returned if httpx (with the h2 extra) is installed, otherwise this falls
+    back to a pooled requests.Session.
+    """
+    if http2:
+        if httpx is not None:
+            try:
+                limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                return httpx.Client(http2=True, limits=limits)
+            except ImportError:
+                pass
+        print("Warning: HTTP/2 needs 'pip install httpx[http2]', using HTTP/1.1", file=sys.stderr)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Return the shared HTTP client, creating a default one on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def set_session(session) -> None:
+    """Replace the shared HTTP client (e.g. with a stub in tests).
+
+    Any object with a requests-style get(url, params=..., timeout=...) works.
+    """
+    global _session
+    with _session_lock:
+        _session = session
+
+
+class RateLimiter:
+    """Token bucket shared by every worker thread.
+
+    rate is the sustained number of requests per second and burst the number
+    that may be sent back to back; a rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every worker, e.g. after the server answered 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_rate_limiter = RateLimiter()
+
+
+def set_rate_limiter(limiter: RateLimiter) -> None:
+    """Replace the rate limiter shared by all requests."""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(resp) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, if there is one."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+def get_response(url: str, params: dict, timeout: float):
+    """GET url and return the successful response, retrying transient failures.
+
+    Every attempt waits for the shared rate limiter. Connection errors and
+    429/5xx responses are retried up to MAX_RETRIES times with jittered
+    exponential backoff, honouring Retry-After; a 429 pauses all workers.
+    Raises one of REQUEST_ERRORS once the retries are used up.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        _rate_limiter.acquire()
+        try:
+            resp = get_session().get(url, params=params, timeout=timeout)
+        except REQUEST_ERRORS:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            delay = _retry_after(resp)
+            if delay is None:
+                delay = _backoff(attempt)
+            if resp.status_code == 429:
+                # Slow every worker down, not just this one
+                _rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            continue
+
+        resp.raise_for_status()
+        return resp
+
+
+def get_json(url: str, params: dict, timeout: float):
+    """GET url with get_response and decode the JSON body."""
+    return loads(get_response(url, params, timeout).content)
 
 
 def search_markets(query: str) -> Tuple[Optional[dict], list]:
     """Search for an event and return (event, list_of_markets) tuple."""
     try:
-        resp = requests.get(SEARCH_URL, params={"q": query}, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.RequestException as exc:
+        data = get_json(SEARCH_URL, {"q": query}, timeout=10)
+    except REQUEST_ERRORS as exc:
         print(f"Error searching markets: {exc}", file=sys.stderr)
         return None, []
 
@@ -31,111 +221,787 @@ def search_markets(query: str) -> Tuple[Optional[dict], list]:
     return None, []
 
 
-def verify_all_trades_fetched(condition_id: str, user_address: str, fetched_count: int, page_limit: int = 5000) -> bool:
-    """Verify that we fetched all trades by checking if there are more beyond our last fetch."""
-    # Check one page beyond what we fetched
-    test_offset = fetched_count
+def new_completeness_report() -> dict:
+    """Return an empty per-market completeness report."""
+    return {
+        "pages": 0,
+        "fetched": 0,
+        "duplicates": 0,
+        "reported_total": None,
+        "reached_end": False,
+        "since": None,
+        "error": None,
+        "resume_offset": None,
+        "resume_cursor": None,
+        "complete": False,
+    }
+
+
+def _finish_report(report: dict, unique_count: int) -> dict:
+    """Decide whether a market's pagination provably returned everything."""
+    total = report["reported_total"]
+    # totalCount covers the whole history, so it cannot be checked on an incremental fetch
+    reconciled = total is None or report["since"] is not None or total in (report["fetched"], unique_count)
+    report["complete"] = report["reached_end"] and report["error"] is None and reconciled
+    return report
+
+
+def describe_report(report: dict) -> str:
+    """One-line human readable summary of a completeness report."""
+    if report["complete"] and report["since"] is not None:
+        summary = f"[OK] Up to date: {report['fetched']} trades since {report['since']} in {report['pages']} page(s)"
+    elif report["complete"]:
+        summary = f"[OK] Complete: {report['fetched']} trades in {report['pages']} page(s)"
+    else:
+        reasons = []
+        if report["error"] and report["resume_offset"] is not None:
+            reasons.append(f"request failed at offset {report['resume_offset']} ({report['error']})")
+        elif report["error"] and report["resume_cursor"] is not None:
+            reasons.append(f"request failed at or before timestamp {report['resume_cursor']} ({report['error']})")
+        elif report["error"]:
+            reasons.append(f"request failed ({report['error']})")
+        elif not report["reached_end"]:
+            reasons.append("stopped before the last page")
+        total = report["reported_total"]
+        if total is not None and report["since"] is None and total != report["fetched"]:
+            reasons.append(f"API reports {total} trades but {report['fetched']} were fetched")
+        summary = "[!] Warning: Additional trades may exist: " + "; ".join(reasons)
+    if report["duplicates"]:
+        summary += f" ({report['duplicates']} duplicate rows across pages dropped)"
+    return summary
+
+
+def _request_page_response(
+    condition_id: str,
+    user_address: Optional[str],
+    page_limit: int,
+    offset: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+):
+    """Request one page of a market's trades and return the undecoded response.
+
+    Without a user_address the page covers every participant in the market.
+    start/end restrict the page to trades within those timestamps (inclusive).
+    """
     params = {
         "limit": page_limit,
-        "offset": test_offset,
+        "offset": offset,
         "takerOnly": "false",
         "market": condition_id,
-        "user": user_address,
     }
-    try:
-        resp = requests.get(TRADES_URL, params=params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        if isinstance(data, dict):
-            batch = data.get("trades", [])
-        elif isinstance(data, list):
-            batch = data
-        else:
-            batch = []
-        
-        return len(batch) == 0
-    except requests.RequestException:
-        return True  # Assume OK if we can't verify
+    if user_address:
+        params["user"] = user_address
+    if start is not None:
+        params["start"] = start
+    if end is not None:
+        params["end"] = end
+    return get_response(TRADES_URL, params, timeout=15)
 
 
-def fetch_trades(condition_id: str, user_address: str, page_limit: int = 5000) -> list:
-    """Fetch all trades for a condition/user with pagination."""
-    all_trades = []
-    offset = 0
+def _request_page(condition_id: str, user_address: Optional[str], page_limit: int, offset: int, **filters):
+    """Request one page of a market's trades and return the decoded body."""
+    return loads(_request_page_response(condition_id, user_address, page_limit, offset, **filters).content)
+
+
+def _page_trades(data) -> list:
+    """Return the trades in a /trades response body."""
+    if isinstance(data, dict):
+        return data.get("trades", [])
+    if isinstance(data, list):
+        return data
+    return []
+
+
+def _parse_page(data, report: dict, condition_id: str) -> list:
+    """Return the trades in a /trades response, noting the first total count in report."""
+    if isinstance(data, dict):
+        # Check if there's a total count in the response
+        total_count = data.get("totalCount") or data.get("total")
+        if total_count is not None and report["reported_total"] is None:
+            print(f"  {condition_id}: API reports total count: {total_count}")
+            report["reported_total"] = total_count
+    return _page_trades(data)
+
+
+def _add_page(batch: list, seen: Counter, all_trades: list, report: dict, count_duplicates: bool = True) -> None:
+    """Append the trades of a page that were not seen on an earlier page.
+
+    seen holds the most fills of each key that one earlier page had.
+    Identical fills are told apart by their order within the page, so a page
+    keeps every copy beyond the ones an earlier page already returned.
+    """
+    page = Counter()
+    for trade in batch:
+        key = trade_key(trade)
+        page[key] += 1
+        if page[key] <= seen[key]:
+            if count_duplicates:
+                report["duplicates"] += 1
+            continue
+        all_trades.append(trade)
+        if not count_duplicates:
+            report["fetched"] += 1
+    for key, count in page.items():
+        if count > seen[key]:
+            seen[key] = count
+    if count_duplicates:
+        report["fetched"] += len(batch)
+
+
+def _fetch_by_cursor(
+    condition_id: str,
+    user_address: Optional[str],
+    page_limit: int,
+    since: Optional[int],
+    seen: Counter,
+    all_trades: list,
+    report: dict,
+    end: Optional[int] = None,
+) -> bool:
+    """Page from newest to oldest with a timestamp cursor instead of an offset.
+
+    Each request asks for trades at or before the oldest timestamp seen so far,
+    so the server never skips over rows and trades arriving mid-pull cannot
+    shift later pages. Trades on the boundary timestamp come back on the next
+    page and are dropped by trade key (transaction hash first). A page that is
+    entirely one timestamp is continued with an offset inside that second.
+    Paging starts at trades at or before end (None for the newest).
+
+    Returns False if the API ignored the time filter; nothing should then be
+    kept from this attempt.
+    """
+    tie_offset = 0
     page_num = 1
 
-    print(f"Fetching trades for condition {condition_id} and user {user_address}...")
-    
     while True:
-        params = {
-            "limit": page_limit,
-            "offset": offset,
-            "takerOnly": "false",
-            "market": condition_id,
-            "user": user_address,
-        }
         try:
-            resp = requests.get(TRADES_URL, params=params, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-        except requests.RequestException as exc:
-            print(f"Error fetching trades: {exc}", file=sys.stderr)
-            return []
-
-        if isinstance(data, dict):
-            batch = data.get("trades", [])
-            # Check if there's a total count in the response
-            total_count = data.get("totalCount") or data.get("total")
-            if total_count is not None:
-                print(f"  API reports total count: {total_count}")
-        elif isinstance(data, list):
-            batch = data
-        else:
-            batch = []
+            data = _request_page(condition_id, user_address, page_limit, tie_offset, start=since, end=end)
+        except REQUEST_ERRORS as exc:
+            print(f"Error fetching trades for {condition_id}: {exc}", file=sys.stderr)
+            report["error"] = str(exc)
+            report["resume_cursor"] = end
+            return True
+
+        batch = _parse_page(data, report, condition_id)
+        report["pages"] += 1
+        timestamps = [t.get("timestamp", 0) for t in batch]
+        if (end is not None and any(ts > end for ts in timestamps)) or (
+            since is not None and any(ts < since for ts in timestamps)
+        ):
+            return False
+        _add_page(batch, seen, all_trades, report, count_duplicates=False)
+        print(f"  {condition_id}: Page {page_num} (before {end or 'now'}): Fetched {len(batch)} trades (total so far: {len(all_trades)})")
 
-        all_trades.extend(batch)
-        print(f"  Page {page_num} (offset {offset}): Fetched {len(batch)} trades (total so far: {len(all_trades)})")
-        
-        # Stop if we got fewer trades than requested (means we're at the end)
         if len(batch) < page_limit:
-            print(f"  Reached end of results (got {len(batch)} < {page_limit} trades)")
-            break
-        
-        # Safety check: if we got exactly page_limit trades, continue
-        offset += page_limit
+            print(f"  {condition_id}: Reached end of results (got {len(batch)} < {page_limit} trades)")
+            report["reached_end"] = True
+            return True
+
+        if timestamps[-1] == end:
+            tie_offset += page_limit
+        else:
+            end, tie_offset = timestamps[-1], 0
         page_num += 1
-        
+
         # Safety limit to prevent infinite loops
-        if page_num > 1000:
-            print(f"  Warning: Reached safety limit of 1000 pages. Stopping.")
-            break
+        if page_num > MAX_PAGES:
+            print(f"  {condition_id}: Warning: Reached safety limit of {MAX_PAGES} pages. Stopping.")
+            return True
 
-    # Verify we got everything if API provided a total count
-    if isinstance(data, dict):
-        total_count = data.get("totalCount") or data.get("total")
-        if total_count is not None and len(all_trades) != total_count:
-            print(f"  Warning: Expected {total_count} trades but fetched {len(all_trades)}")
-    
-    return all_trades
+
+def market_start_time(market: dict) -> Optional[int]:
+    """Epoch seconds at which a market opened: the earliest of its start and creation times, if present."""
+    times = []
+    for field in ("startDate", "createdAt", "startDateIso"):
+        value = market.get(field)
+        if not value:
+            continue
+        try:
+            times.append(int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()))
+        except (TypeError, ValueError):
+            continue
+    return min(times, default=None)
+
+
+def _split_window(lo: int, hi: int, parts: int) -> list:
+    """Split [lo, hi] into up to parts disjoint windows, newest first."""
+    parts = max(1, min(parts, hi - lo + 1))
+    step = (hi - lo + 1) / parts
+    bounds = [lo + int(step * i) for i in range(parts)] + [hi + 1]
+    return [(bounds[i], bounds[i + 1] - 1) for i in reversed(range(parts)) if bounds[i] < bounds[i + 1]]
+
+
+def _fetch_sharded(
+    condition_id: str,
+    user_address: Optional[str],
+    page_limit: int,
+    start_time: int,
+    workers: int,
+    report: dict,
+    end: Optional[int] = None,
+) -> Optional[list]:
+    """Fetch trades from start_time to end (None for now) in parallel time windows, newest first.
+
+    Full windows are split and fetched by up to workers threads. Windows that
+    fail are left out and recorded in the report's resume_cursor. Returns None
+    if the API ignored the time filter.
+    """
+    pieces = []  # (newest-first sort key, trades)
+    missing = []  # upper bounds of the windows left out, None for now
+    requests_made = 0
+    split = max(SHARD_SPLIT, workers)
+
+    def fetch_window(lo, hi, offset):
+        # Totals are per window here, so they are not reconciled
+        return _page_trades(_request_page(condition_id, user_address, page_limit, offset, start=lo, end=hi))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(fetch_window, start_time, end, 0): (start_time, end, 0)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                lo, hi, offset = pending.pop(future)
+                requests_made += 1
+                report["pages"] += 1
+                try:
+                    batch = future.result()
+                except REQUEST_ERRORS as exc:
+                    print(f"Error fetching trades for {condition_id}: {exc}", file=sys.stderr)
+                    report["error"] = str(exc)
+                    missing.append(hi)
+                    continue
+
+                timestamps = [t.get("timestamp", 0) for t in batch]
+                if any(ts < lo or (hi is not None and ts > hi) for ts in timestamps):
+                    for other in pending:
+                        other.cancel()
+                    return None
+
+                windows = []
+                if len(batch) < page_limit:
+                    pieces.append(((-lo, offset), batch))
+                elif timestamps[0] == timestamps[-1]:
+                    # A whole page within one second; page through it by offset
+                    second = timestamps[-1]
+                    pieces.append(((-second, offset), batch))
+                    windows = [(second, second, offset + page_limit)]
+                    if lo < second and offset == 0:
+                        windows += [(w_lo, w_hi, 0) for w_lo, w_hi in _split_window(lo, second - 1, split)]
+                else:
+                    oldest = timestamps[-1]
+                    pieces.append(((-(oldest + 1), 0), [t for t, ts in zip(batch, timestamps) if ts > oldest]))
+                    windows = [(w_lo, w_hi, 0) for w_lo, w_hi in _split_window(lo, oldest, split)]
+
+                if requests_made + len(pending) + len(windows) > MAX_SHARD_REQUESTS:
+                    print(f"  {condition_id}: Warning: Reached safety limit of {MAX_SHARD_REQUESTS} shard requests. Stopping.")
+                    report["error"] = report["error"] or "shard request limit reached"
+                    missing.extend(w_hi for _, w_hi, _ in windows)
+                    continue
+                for window in windows:
+                    pending[pool.submit(fetch_window, *window)] = window
+
+    pieces.sort(key=lambda piece: piece[0])
+    trades = [trade for _, batch in pieces for trade in batch]
+    report["fetched"] = len(trades)
+    report["reached_end"] = report["error"] is None
+    if missing and None not in missing:
+        report["resume_cursor"] = max(missing)
+    print(f"  {condition_id}: Fetched {len(trades)} trades in {requests_made} time-window requests")
+    return trades
+
+
+def fetch_trades_with_report(
+    condition_id: str,
+    user_address: Optional[str],
+    page_limit: int = 5000,
+    since: Optional[int] = None,
+    page_workers: int = DEFAULT_PAGE_WORKERS,
+    start_offset: int = 0,
+    pagination: str = "offset",
+    start_time: Optional[int] = None,
+    resume_cursor: Optional[int] = None,
+) -> Tuple[list, dict]:
+    """Fetch all trades for a condition/user and report whether the set is complete.
+
+    user_address=None fetches the whole market. since keeps only trades at or
+    after that timestamp. pagination is "offset", "cursor" or "sharded" (from
+    start_time); page_workers bounds concurrent requests. To continue a failed
+    pull pass the report's resume_offset as start_offset or its resume_cursor
+    as resume_cursor, or use resume_fetch.
+    """
+    all_trades = []
+    seen = Counter()
+    report = new_completeness_report()
+    report["since"] = since
+
+    print(f"Fetching trades for condition {condition_id} and user {user_address or '(all users)'}...")
+
+    # An offset only means something to offset paging, so it resumes that
+    if pagination == "sharded" and start_offset == 0:
+        lo = max(since or 0, start_time or 0)
+        trades = _fetch_sharded(condition_id, user_address, page_limit, lo, page_workers, report, resume_cursor)
+        if trades is not None:
+            return trades, _finish_report(report, len(trades))
+        print(f"  {condition_id}: API ignored the time filter, falling back to offset pagination")
+        report = new_completeness_report()
+        report["since"] = since
+
+    if pagination == "cursor" and start_offset == 0:
+        if _fetch_by_cursor(condition_id, user_address, page_limit, since, seen, all_trades, report, resume_cursor):
+            return all_trades, _finish_report(report, len(all_trades))
+        print(f"  {condition_id}: API ignored the time filter, falling back to offset pagination")
+        all_trades.clear()
+        seen.clear()
+        report = new_completeness_report()
+        report["since"] = since
+
+    for offset, batch in _iter_offset_pages(condition_id, user_address, page_limit, since, page_workers, start_offset, report):
+        _add_page(batch, seen, all_trades, report)
+        print(f"  {condition_id}: Page {report['pages']} (offset {offset}): Fetched {len(batch)} trades (total so far: {len(all_trades)})")
+    return all_trades, _finish_report(report, len(all_trades))
+
+
+def resume_fetch(condition_id: str, user_address: Optional[str], trades: list, report: dict, **options) -> Tuple[list, dict]:
+    """Continue a pull that stopped at a failed request.
+
+    trades and report are what fetch_trades_with_report returned; options
+    must repeat its other arguments. Returns every trade of both pulls and a
+    report for the whole. A resumed offset pull starts at the failed page. A
+    resumed cursor or sharded pull re-reads everything at or before
+    resume_cursor, so the first pull keeps only the trades after it.
+    """
+    if report["resume_offset"] is not None:
+        more, resumed = fetch_trades_with_report(
+            condition_id, user_address, start_offset=report["resume_offset"], **options
+        )
+        joined = trades + more
+    else:
+        cursor = report["resume_cursor"]
+        more, resumed = fetch_trades_with_report(condition_id, user_address, resume_cursor=cursor, **options)
+        joined = more if cursor is None else [t for t in trades if t.get("timestamp", 0) > cursor] + more
+    resumed["pages"] += report["pages"]
+    resumed["duplicates"] += report["duplicates"]
+    resumed["fetched"] = len(joined)
+    # The first pull's total, when known, covers the whole history
+    if report["reported_total"] is not None:
+        resumed["reported_total"] = report["reported_total"]
+    return joined, _finish_report(resumed, len(joined))
+
+
+def _iter_offset_pages(
+    condition_id: str,
+    user_address: Optional[str],
+    page_limit: int,
+    since: Optional[int],
+    page_workers: int,
+    start_offset: int,
+    report: dict,
+) -> Iterator[Tuple[int, list]]:
+    """Yield (offset, trades) for each page requested by offset.
+
+    Trades older than since are dropped from the pages. The end of the
+    results and any request failure are recorded in report. Closing the
+    generator early cancels the pages still in flight.
+    """
+    offset = start_offset
+    page_num = 1
+    pool = None
+    pending = {}
+    prefetcher = None
+    prefetched = None
+
+    try:
+        while True:
+            try:
+                if offset in pending:
+                    data = pending.pop(offset).result()
+                else:
+                    if prefetched is not None and prefetched[0] == offset:
+                        resp = prefetched[1].result()
+                    else:
+                        resp = _request_page_response(condition_id, user_address, page_limit, offset)
+                    prefetched = None
+                    # Once a page has come back full, keep the next request in
+                    # flight while this page is decoded and consumed
+                    if page_num > 1 and since is None and not pending:
+                        if prefetcher is None:
+                            prefetcher = ThreadPoolExecutor(max_workers=1)
+                        next_offset = offset + page_limit
+                        prefetched = (next_offset, prefetcher.submit(
+                            _request_page_response, condition_id, user_address, page_limit, next_offset
+                        ))
+                    data = loads(resp.content)
+            except REQUEST_ERRORS as exc:
+                print(f"Error fetching trades for {condition_id}: {exc}", file=sys.stderr)
+                report["error"] = str(exc)
+                report["resume_offset"] = offset
+                return
+
+            batch = _parse_page(data, report, condition_id)
+            report["pages"] += 1
+            page_size = len(batch)
+            # An oldest-first page cannot be cut at since, so fall back to a full pull
+            overlaps_store = since is not None and _is_newest_first(batch) and batch[-1].get("timestamp", 0) < since
+            if since is not None:
+                batch = [t for t in batch if t.get("timestamp", 0) >= since]
+            yield offset, batch
+
+            if overlaps_store:
+                print(f"  {condition_id}: Reached trades already stored (older than {since})")
+                report["reached_end"] = True
+                break
+
+            # Stop if we got fewer trades than requested (means we're at the end)
+            if page_size < page_limit:
+                print(f"  {condition_id}: Reached end of results (got {page_size} < {page_limit} trades)")
+                report["reached_end"] = True
+                break
+
+            # The total is known, so every remaining page can be requested up front
+            total_count = report["reported_total"]
+            if pool is None and total_count and since is None and page_workers > 1:
+                remaining = range(offset + page_limit, min(total_count, MAX_PAGES * page_limit), page_limit)
+                if len(remaining) > 1:
+                    pool = ThreadPoolExecutor(max_workers=min(page_workers, len(remaining)))
+                    pending = {
+                        page_offset: pool.submit(_request_page, condition_id, user_address, page_limit, page_offset)
+                        for page_offset in remaining
+                    }
+
+            # Safety check: if we got exactly page_limit trades, continue
+            offset += page_limit
+            page_num += 1
+
+            # Safety limit to prevent infinite loops
+            if page_num > MAX_PAGES:
+                print(f"  {condition_id}: Warning: Reached safety limit of {MAX_PAGES} pages. Stopping.")
+                break
+    finally:
+        if pool is not None:
+            for future in pending.values():
+                future.cancel()
+            pool.shutdown(wait=True)
+        if prefetcher is not None:
+            # A speculative request past the last page is simply dropped
+            prefetcher.shutdown(wait=False)
+
+
+def _is_newest_first(batch: list) -> bool:
+    """Whether a page is ordered from newest to oldest trade."""
+    return bool(batch) and batch[0].get("timestamp", 0) >= batch[-1].get("timestamp", 0)
+
+
+def fetch_trades(condition_id: str, user_address: str, page_limit: int = 5000) -> list:
+    """Fetch all trades for a condition/user with pagination."""
+    trades, report = fetch_trades_with_report(condition_id, user_address, page_limit)
+    if not report["complete"]:
+        print(f"  {describe_report(report)}")
+    return trades
+
+
+def iter_trades(
+    condition_id: str,
+    user_address: Optional[str] = None,
+    page_limit: int = 5000,
+    since: Optional[int] = None,
+    report: Optional[dict] = None,
+) -> Iterator[dict]:
+    """Yield a market's trades, newest first, one page at a time.
+
+    Unlike fetch_trades nothing is accumulated: at most the current page and
+    the one being prefetched are held, so the stream can be consumed in
+    constant memory. Rows repeated from the previous page (the API shifts
+    offsets when trades arrive mid-pull) are dropped.
+
+    Pass a report from new_completeness_report() to learn, once the generator
+    is exhausted, whether the stream was complete.
+    """
+    if report is None:
+        report = new_completeness_report()
+    report["since"] = since
+    previous = set()
+    for _, batch in _iter_offset_pages(condition_id, user_address, page_limit, since, 1, 0, report):
+        keys = set()
+        for trade in batch:
+            key = trade_key(trade)
+            keys.add(key)
+            if key in previous:
+                report["duplicates"] += 1
+                continue
+            yield trade
+        report["fetched"] += len(batch)
+        previous = keys
+    _finish_report(report, report["fetched"] - report["duplicates"])
+
+
+def iter_event_trades(
+    markets: list,
+    user_address: Optional[str] = None,
+    page_limit: int = 5000,
+    reports: Optional[dict] = None,
+) -> Iterator[Tuple[dict, dict]]:
+    """Yield (market, trade) for every market of an event, one market after another.
+
+    See iter_trades. When reports is a dict, each market's completeness
+    report is stored in it under the market's conditionId.
+    """
+    for market in markets:
+        condition_id = market.get("conditionId")
+        if not condition_id:
+            continue
+        report = new_completeness_report()
+        if reports is not None:
+            reports[condition_id] = report
+        for trade in iter_trades(condition_id, user_address, page_limit, report=report):
+            yield market, trade
+
+
+def _fetch_market(
+    market: dict,
+    user_address: str,
+    since: Optional[int] = None,
+    page_workers: int = DEFAULT_PAGE_WORKERS,
+    pagination: str = "offset",
+) -> Tuple[list, dict]:
+    """Fetch one sub-market's trades together with its completeness report."""
+    start_time = market_start_time(market)
+    if since is None:
+        return fetch_trades_with_report(
+            market["conditionId"], user_address, page_workers=page_workers,
+            pagination=pagination, start_time=start_time,
+        )
+    return fetch_trades_with_report(
+        market["conditionId"], user_address, INCREMENTAL_PAGE_LIMIT, since=since,
+        page_workers=page_workers, pagination=pagination, start_time=start_time,
+    )
+
+
+def _merge_with_store(store: TradeStore, market: dict, user_address: str, trades: list, report: dict) -> list:
+    """Save a finished job's trades to the store and return its full stored history."""
+    condition_id = market["conditionId"]
+    if report["reached_end"] and report["error"] is None:
+        added = store.add_trades(condition_id, user_address, trades)
+        if report["since"] is not None:
+            print(f"  {condition_id} / {user_address or '(all users)'}: stored {added} new trade(s)")
+        return store.load_trades(condition_id, user_address)
+    # Partial results (a failed page or the page safety limit)
+    # are not stored: they would hide the older trades still
+    # missing behind the newest stored timestamp
+    stored = store.load_trades(condition_id, user_address)
+    known = Counter(trade_key(t) for t in stored)
+    fresh = []
+    for trade in trades:
+        key = trade_key(trade)
+        if known[key]:
+            known[key] -= 1
+        else:
+            fresh.append(trade)
+    return stored + fresh
+
+
+def iter_jobs_as_completed(
+    jobs: list,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    store: Optional[TradeStore] = None,
+    page_workers: int = DEFAULT_PAGE_WORKERS,
+    pagination: str = "offset",
+) -> Iterator[Tuple[int, dict, str, list, dict]]:
+    """Fetch trades for (market, user_address) jobs with at most max_workers in flight.
+
+    Each job may additionally fetch up to page_workers pages at once.
+
+    With a store, each job only fetches trades newer than the newest stored
+    one; new trades are saved and the job's full stored history is returned.
+
+    Yields (index, market, user_address, trades, completeness_report) as each
+    job finishes, where index is the job's position in jobs. Jobs whose market
+    has no conditionId are skipped. New jobs start only as finished ones are
+    consumed, so at most max_workers results are held besides the one yielded.
+    """
+    indexed = [(idx, m, user) for idx, (m, user) in enumerate(jobs) if m.get("conditionId")]
+    if not indexed:
+        return
+    workers = max(1, min(max_workers, len(indexed)))
+    queue = iter(indexed)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def submit_next() -> None:
+            job = next(queue, None)
+            if job is not None:
+                market, user_address = job[1], job[2]
+                since = store.latest_timestamp(market["conditionId"], user_address) if store else None
+                pending[pool.submit(_fetch_market, market, user_address, since, page_workers, pagination)] = job
+
+        for _ in range(workers):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            while done:
+                future = done.pop()
+                idx, market, user_address = pending.pop(future)
+                trades, report = future.result()
+                del future
+                if store is not None:
+                    # SQLite connections stay on this thread, so the store is updated here
+                    trades = _merge_with_store(store, market, user_address, trades, report)
+                submit_next()
+                yield idx, market, user_address, trades, report
+                del trades
+
+
+def iter_markets_as_completed(
+    markets: list,
+    user_address: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    store: Optional[TradeStore] = None,
+    page_workers: int = DEFAULT_PAGE_WORKERS,
+    pagination: str = "offset",
+) -> Iterator[Tuple[int, dict, list, dict]]:
+    """Fetch one user's trades for every market, see iter_jobs_as_completed.
+
+    Yields (index, market, trades, completeness_report) as each market finishes,
+    where index is the market's position in markets.
+    """
+    jobs = [(market, user_address) for market in markets]
+    for idx, market, _, trades, report in iter_jobs_as_completed(jobs, max_workers, store, page_workers, pagination):
+        yield idx, market, trades, report
+
+
+def spool_trades(trades: list, directory: str) -> str:
+    """Write one market's trades, oldest first, to a spool file and return its path.
+
+    Each line is "<timestamp>\\t<compact trade JSON>" so merging never re-parses trades.
+    """
+    trades.sort(key=lambda x: x.get("timestamp", 0))
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".spool")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for trade in trades:
+            f.write(f"{int(trade.get('timestamp', 0))}\t{dumps(trade)}\n")
+    return path
+
+
+def _read_spool(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (timestamp, trade_json) rows from a spool file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            timestamp, _, trade_json = line.partition("\t")
+            yield int(timestamp), trade_json.rstrip("\n")
+
+
+def write_merged_trades(spool_paths: list, output_file: str, ndjson: bool = False) -> int:
+    """Merge spooled markets by timestamp into output_file and return the trade count.
+
+    Writes a compact JSON array (one trade per line) or NDJSON. The file is
+    written next to output_file and renamed into place, so readers never see a
+    partial file. Trades with equal timestamps keep the order of spool_paths.
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".trades-", suffix=".tmp")
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            merged = heapq.merge(*(_read_spool(path) for path in spool_paths), key=lambda row: row[0])
+            if not ndjson:
+                f.write("[")
+            for _, trade_json in merged:
+                if ndjson:
+                    f.write(trade_json + "\n")
+                else:
+                    f.write(("\n" if count == 0 else ",\n") + trade_json)
+                count += 1
+            if not ndjson:
+                f.write("\n]\n")
+        # mkstemp creates 0600 files; give the output the usual umask-based mode
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+def add_fetch_options(parser: argparse.ArgumentParser, output: bool = True) -> None:
+    """Add the options shared by every command that fetches trades.
+
+    output=False leaves out the trades file format, for commands that write none.
+    """
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_MAX_WORKERS,
+        help=f"maximum number of sub-markets fetched at once (default: {DEFAULT_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--page-workers", type=int, default=DEFAULT_PAGE_WORKERS,
+        help=f"maximum number of pages of one market fetched at once (default: {DEFAULT_PAGE_WORKERS})",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=DEFAULT_RATE_LIMIT,
+        help=f"maximum requests per second across all workers, 0 for no limit (default: {DEFAULT_RATE_LIMIT:g})",
+    )
+    parser.add_argument(
+        "--pagination", choices=("offset", "cursor", "sharded"), default="offset",
+        help=(
+            "page by offset, by timestamp cursor, or by time windows fetched in parallel; "
+            "the last two need API time filters (default: offset)"
+        ),
+    )
+    parser.add_argument("--http2", action="store_true", help="use HTTP/2 (requires httpx[http2])")
+    parser.add_argument(
+        "--store", nargs="?", const=DEFAULT_STORE_FILE, default=None, metavar="PATH",
+        help=f"keep trades in a local SQLite store and only fetch new ones (default path: {DEFAULT_STORE_FILE})",
+    )
+    parser.add_argument(
+        "--search-cache", nargs="?", const=DEFAULT_CACHE_FILE, default=None, metavar="PATH",
+        help=f"cache market searches on disk; a cached conditionId can be used as the query (default path: {DEFAULT_CACHE_FILE})",
+    )
+    if output:
+        parser.add_argument(
+            "--ndjson", action="store_true",
+            help="write one JSON trade per line instead of a JSON array",
+        )
+
+
+def configure_client(args: argparse.Namespace) -> None:
+    """Set up the shared HTTP client and rate limiter from the fetch options."""
+    set_session(create_session(pool_size=args.workers * args.page_workers, http2=args.http2))
+    set_rate_limiter(RateLimiter(args.rate))
+
+
+def find_event(market_query: str, search_cache: Optional[str] = None) -> Tuple[Optional[dict], list]:
+    """Search for an event, going through the on-disk cache when one is given."""
+    print(f"Searching for event: {market_query}")
+    if search_cache:
+        return MarketCache(search_cache).search(market_query, search_markets)
+    return search_markets(market_query)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fetch and save Polymarket trades for a user across an event's markets.",
+        epilog="Example:\n  python fetch_trades.py 'Will Trump win?' 0x1234... trades.json",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("market_query", help="search query used to find the event")
+    parser.add_argument("user_address", help="wallet address of the trader")
+    parser.add_argument("output_file", nargs="?", default=DEFAULT_OUTPUT_FILE, help="where to save the trades")
+    add_fetch_options(parser)
+    return parser.parse_args(argv)
 
 
 def main():
     """Main function to fetch and save trades."""
-    # Parse command line arguments
-    if len(sys.argv) < 3:
-        print("Usage: python fetch_trades.py <market_query> <user_address> [output_file]")
-        print("\nExample:")
-        print("  python fetch_trades.py 'Will Trump win?' 0x1234... trades.json")
-        sys.exit(1)
-
-    market_query = sys.argv[1]
-    user_address = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_OUTPUT_FILE
+    args = parse_args()
+    market_query = args.market_query
+    user_address = args.user_address
+    output_file = args.output_file
+    configure_client(args)
 
     # Search for event and its markets
-    print(f"Searching for event: {market_query}")
-    event, markets = search_markets(market_query)
+    event, markets = find_event(market_query, args.search_cache)
     
     if not event or not markets:
         print("Error: No market found for that query.", file=sys.stderr)
@@ -144,50 +1010,50 @@ def main():
     print(f"\nFound event: {event.get('title', 'Unknown Event')}")
     print(f"Found {len(markets)} sub-markets under this event. Fetching trades for all of them...\n")
 
-    all_trades = []
-    
-    for idx, market in enumerate(markets):
-        market_title = (
-            market.get("question")
-            or market.get("title")
-            or event.get("title", "Unknown Market")
-        )
-        condition_id = market.get("conditionId") or ""
-        
-        if not condition_id:
-            continue
-            
-        print(f"--- Market {idx+1}/{len(markets)}: {market_title} ---")
-        print(f"Condition ID: {condition_id}")
-
-        # Fetch trades
-        trades = fetch_trades(condition_id, user_address)
-        
-        if trades:
-            if verify_all_trades_fetched(condition_id, user_address, len(trades)):
-                print("  [OK] Verification passed: All trades fetched.")
-            else:
-                print("  [!] Warning: Additional trades may exist.")
-            all_trades.extend(trades)
-        else:
-            print("  No trades found in this sub-market.")
-        print()
-    
-    if not all_trades:
-        print("No trades found for that user across all markets in this event.")
-        sys.exit(0)
+    store = TradeStore(args.store) if args.store else None
+    total_trades = 0
+    with tempfile.TemporaryDirectory(prefix="fetch-trades-") as spool_dir:
+        # Each market is spooled to disk as soon as it finishes, and new markets
+        # only start as finished ones are spooled, so memory holds the trades
+        # of at most --workers markets plus the one being spooled
+        spools = {}
+        try:
+            for idx, market, trades, report in iter_markets_as_completed(
+                markets, user_address, max_workers=args.workers, store=store,
+                page_workers=args.page_workers, pagination=args.pagination,
+            ):
+                market_title = (
+                    market.get("question")
+                    or market.get("title")
+                    or event.get("title", "Unknown Market")
+                )
+                print(f"--- Market {idx+1}/{len(markets)}: {market_title} ---")
+                print(f"Condition ID: {market['conditionId']}")
 
-    # Sort by timestamp
-    all_trades.sort(key=lambda x: x.get("timestamp", 0))
+                if trades:
+                    print(f"  {describe_report(report)}")
+                    spools[idx] = spool_trades(trades, spool_dir)
+                    total_trades += len(trades)
+                elif report["error"]:
+                    print(f"  {describe_report(report)}")
+                else:
+                    print("  No trades found in this sub-market.")
+                print()
+        finally:
+            if store is not None:
+                store.close()
 
-    # Save to file
-    try:
-        with open(output_file, "w") as f:
-            json.dump(all_trades, f, indent=2)
-        print(f"Successfully saved {len(all_trades)} total trades to {output_file}")
-    except IOError as exc:
-        print(f"Error writing to file: {exc}", file=sys.stderr)
-        sys.exit(1)
+        if not total_trades:
+            print("No trades found for that user across all markets in this event.")
+            sys.exit(0)
+
+        # Merge the per-market files by timestamp and save
+        try:
+            count = write_merged_trades([spools[idx] for idx in sorted(spools)], output_file, ndjson=args.ndjson)
+            print(f"Successfully saved {count} total trades to {output_file}")
+        except IOError as exc:
+            print(f"Error writing to file: {exc}", file=sys.stderr)
+            sys.exit(1)
 
 
 if __name__ == "__main__":
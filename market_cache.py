@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of market searches (query -> event and its markets).
+Entries are served fresh for a TTL, then served stale while a background
+refresh runs, and every cached market is indexed by its conditionId.
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from typing import Callable, Optional, Tuple
+
+DEFAULT_CACHE_FILE = "market_cache.json"
+# Served without a request for this long
+DEFAULT_TTL = 6 * 3600
+# After the TTL, served as-is for this long while a refresh runs in the background
+DEFAULT_STALE_TTL = 7 * 24 * 3600
+
+CONDITION_ID_RE = re.compile(r"^0x[0-9a-fA-F]{64}$")
+
+
+class MarketCache:
+    """Search results cached in a JSON file.
+
+    The file holds {"queries": {query: entry}, "markets": {conditionId: entry}}
+    where a query entry lists the conditionIds of the event it found and a
+    market entry holds the market plus its event (without the markets list).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttl: float = DEFAULT_TTL, stale_ttl: float = DEFAULT_STALE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock = threading.Lock()
+        self.refreshes = []
+        self.data = {"queries": {}, "markets": {}}
+        try:
+            with open(path, "r") as f:
+                loaded = json.load(f)
+            self.data["queries"].update(loaded.get("queries", {}))
+            self.data["markets"].update(loaded.get("markets", {}))
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            print(f"Warning: ignoring unreadable market cache {path}")
+
+    def search(self, query: str, search_func: Callable[[str], Tuple[Optional[dict], list]]) -> Tuple[Optional[dict], list]:
+        """Return (event, markets) for query, calling search_func only when needed.
+
+        A conditionId that has been seen before is answered from the index
+        without any request, since a market never moves to another event.
+        """
+        if CONDITION_ID_RE.match(query):
+            with self.lock:
+                entry = self.data["markets"].get(query.lower())
+            if entry is not None:
+                return entry["event"], [entry["market"]]
+
+        with self.lock:
+            entry = self.data["queries"].get(query)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.ttl:
+                return self._resolve(entry)
+            if age < self.ttl + self.stale_ttl:
+                refresh = threading.Thread(target=self._refresh, args=(query, search_func))
+                refresh.start()
+                self.refreshes.append(refresh)
+                return self._resolve(entry)
+
+        return self._refresh(query, search_func)
+
+    def _refresh(self, query: str, search_func) -> Tuple[Optional[dict], list]:
+        """Run the real search and store its result."""
+        event, markets = search_func(query)
+        if event and markets:
+            self.put(query, event, markets)
+        return event, markets
+
+    def _resolve(self, entry: dict) -> Tuple[dict, list]:
+        """Rebuild (event, markets) from a cached query entry."""
+        with self.lock:
+            markets = [self.data["markets"][cid]["market"] for cid in entry["condition_ids"] if cid in self.data["markets"]]
+        return entry["event"], markets
+
+    def put(self, query: str, event: dict, markets: list) -> None:
+        """Cache a search result and index its markets, then save the file."""
+        now = time.time()
+        slim_event = {k: v for k, v in event.items() if k != "markets"}
+        condition_ids = []
+        with self.lock:
+            for market in markets:
+                condition_id = (market.get("conditionId") or "").lower()
+                if not condition_id:
+                    continue
+                condition_ids.append(condition_id)
+                self.data["markets"][condition_id] = {"fetched_at": now, "event": slim_event, "market": market}
+            self.data["queries"][query] = {"fetched_at": now, "event": slim_event, "condition_ids": condition_ids}
+            self._save()
+
+    def _save(self) -> None:
+        """Write the cache file atomically. Caller holds the lock."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".market-cache-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"Warning: could not save market cache: {exc}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def close(self) -> None:
+        """Wait for background refreshes to finish."""
+        for refresh in self.refreshes:
+            refresh.join()
+        self.refreshes = []
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+One-pass summary statistics for the analysis scripts.
+RunningStats replaces the per-trade price and size lists: it keeps the count,
+mean and variance, min/max, first/last, a quantile sketch and a
+coarse ordered profile in constant memory, and merges with another summary.
+"""
+
+import math
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only from_array needs it
+    np = None
+
+# Items the sketch keeps per level; quantiles are exact up to this many values
+SKETCH_SIZE = 200
+# Buckets of the ordered profile; early/late means are exact up to this many values
+PROFILE_BUCKETS = 256
+# Values RunningStats buffers before folding them in as one batch
+BATCH_SIZE = 1024
+
+
+class QuantileSketch:
+    """A KLL-style mergeable quantile sketch.
+
+    Values enter level 0; a level that outgrows its capacity is sorted and
+    every other item moves up a level with twice the weight. Capacities
+    shrink by 2/3 per level below the top one, so the sketch stays at about
+    3 * size items and a quantile's rank is off by a small fraction of n.
+    """
+
+    def __init__(self, size: int = SKETCH_SIZE):
+        self.size = size
+        self.levels = [[]]
+        self.count = 0
+        # Items held, and how many the levels may hold together
+        self.held = 0
+        self.limit = size
+        # Alternates which half a compaction keeps, so errors cancel out
+        self.offset = 0
+
+    @classmethod
+    def from_sorted(cls, values, size: int = SKETCH_SIZE) -> "QuantileSketch":
+        """Build a sketch directly from values sorted in ascending order.
+
+        Instead of compacting level by level, the values are cut into blocks
+        of 2**h and each block is kept once at level h, with h the smallest
+        height whose levels may hold all the blocks together; the leftover
+        values are split into smaller blocks by the binary digits of their
+        count. Ranks are then off by less than one block, and a sketch of up
+        to size values is exact.
+        """
+        sketch = cls(size)
+        count = len(values)
+        height = 0
+        while True:
+            sketch.levels = [[] for _ in range(height + 1)]
+            sketch.limit = sum(sketch._capacity(level) for level in range(height + 1))
+            if (count >> height) + height <= sketch.limit:
+                break
+            height += 1
+        block = 1 << height
+        full = count - count % block
+        # The middle value of each block stands for it
+        sketch.levels[height] = [float(value) for value in values[block // 2:full:block]]
+        start = full
+        for level in reversed(range(height)):
+            if (count - start) >> level:
+                sketch.levels[level].append(float(values[start + (1 << level) // 2]))
+                start += 1 << level
+        sketch.count = count
+        sketch.held = sum(len(items) for items in sketch.levels)
+        return sketch
+
+    def _capacity(self, level: int) -> int:
+        """Items a level may hold before it is compacted."""
+        depth = len(self.levels) - 1 - level
+        return max(2, math.ceil(self.size * (2 / 3) ** depth))
+
+    def _compress(self) -> None:
+        """Compact the lowest overfull level until the sketch fits its limit.
+
+        Compaction is lazy: levels may overflow while the total fits, so a
+        stream of adds only pays for a sort now and then.
+        """
+        while self.held > self.limit:
+            for h, items in enumerate(self.levels):
+                if len(items) > self._capacity(h):
+                    break
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+                self.limit = sum(self._capacity(level) for level in range(len(self.levels)))
+            items.sort()
+            # An odd item out stays at this level
+            kept = [items.pop()] if len(items) % 2 else []
+            promoted = items[self.offset::2]
+            self.levels[h + 1].extend(promoted)
+            self.offset ^= 1
+            self.levels[h] = kept
+            self.held -= len(items) - len(promoted)
+
+    def add(self, value: float) -> None:
+        """Add one value."""
+        self.levels[0].append(value)
+        self.count += 1
+        self.held += 1
+        if self.held > self.limit:
+            self._compress()
+
+    def extend(self, values) -> None:
+        """Add a batch of values."""
+        values = list(values)
+        self.levels[0].extend(values)
+        self.count += len(values)
+        self.held += len(values)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.count += other.count
+        self.held += other.held
+        self.limit = sum(self._capacity(level) for level in range(len(self.levels)))
+        self._compress()
+
+    def copy(self) -> "QuantileSketch":
+        """An independent copy of the sketch."""
+        other = QuantileSketch(self.size)
+        other.levels = [list(items) for items in self.levels]
+        other.count, other.held, other.limit, other.offset = self.count, self.held, self.limit, self.offset
+        return other
+
+    def quantile(self, q: float) -> float:
+        """The smallest value whose rank reaches q * count (None when empty)."""
+        weighted = sorted((value, 1 << h) for h, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return None
+        ranks = []
+        total = 0
+        for _, weight in weighted:
+            total += weight
+            ranks.append(total)
+        index = bisect_left(ranks, q * total)
+        return weighted[min(index, len(weighted) - 1)][0]
+
+
+class RunningStats:
+    """Count, mean, variance, extremes, quantiles and ordered profile of a stream of values.
+
+    Values are buffered and folded in BATCH_SIZE at a time: each batch's
+    mean and squared differences come from two exact passes and join the
+    totals with Chan et al.'s pairwise update, the streaming form of
+    Welford's method. The profile keeps the stream in order as at most
+    PROFILE_BUCKETS runs of (count, sum), doubling the run length when full,
+    so means over a range of positions (say, the first third) cost no
+    per-value memory.
+    """
+
+    __slots__ = ("_count", "_mean", "_m2", "_min", "_max", "_first", "_last", "sketch", "profile", "span", "pending")
+
+    def __init__(self):
+        self._count = 0
+        self._mean = 0.0
+        # Sum of squared differences from the mean
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+        self._first = None
+        self._last = None
+        self.sketch = QuantileSketch()
+        self.profile = []
+        # Values per full profile bucket
+        self.span = 1
+        self.pending = []
+
+    def __getstate__(self):
+        self._flush()
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_values(cls, values) -> "RunningStats":
+        """Summarize a sequence of values in order."""
+        stats = cls()
+        stats.extend(values)
+        return stats
+
+    def copy(self) -> "RunningStats":
+        """An independent copy, unaffected by values added to this one later."""
+        self._flush()
+        other = RunningStats()
+        other._count, other._mean, other._m2 = self._count, self._mean, self._m2
+        other._min, other._max, other._first, other._last = self._min, self._max, self._first, self._last
+        other.sketch = self.sketch.copy()
+        other.profile = [list(bucket) for bucket in self.profile]
+        other.span = self.span
+        return other
+
+    @classmethod
+    def from_array(cls, values) -> "RunningStats":
+        """Summarize a NumPy array of values in order, without a Python step per value.
+
+        The moments and extremes are array reductions, the profile buckets
+        come from one np.add.reduceat, and the sketch is built from the
+        sorted array (see QuantileSketch.from_sorted).
+        """
+        if np is None:
+            raise ValueError("RunningStats.from_array needs 'pip install numpy'")
+        values = np.asarray(values, dtype=np.float64)
+        stats = cls()
+        count = len(values)
+        if not count:
+            return stats
+        mean = float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        stats._combine(count, mean, m2, float(values.min()), float(values.max()), float(values[0]), float(values[-1]))
+        stats.sketch = QuantileSketch.from_sorted(np.sort(values))
+
+        # The span the profile would have doubled to if the values were added one by one
+        while -(-count // stats.span) > PROFILE_BUCKETS:
+            stats.span *= 2
+        starts = np.arange(0, count, stats.span)
+        sums = np.add.reduceat(values, starts)
+        sizes = np.diff(np.append(starts, count))
+        stats.profile = [[size, total] for size, total in zip(sizes.tolist(), sums.tolist())]
+        return stats
+
+    def add(self, value: float) -> None:
+        """Add one value."""
+        self.pending.append(value)
+        if len(self.pending) >= BATCH_SIZE:
+            self._flush()
+
+    def extend(self, values) -> None:
+        """Add values in order."""
+        self.pending.extend(values)
+        self._flush()
+
+    def _flush(self) -> None:
+        """Fold the buffered values into the totals, sketch and profile."""
+        values = self.pending
+        if not values:
+            return
+        self.pending = []
+        count = len(values)
+        mean = math.fsum(values) / count
+        m2 = math.fsum([(value - mean) ** 2 for value in values])
+        self._combine(count, mean, m2, min(values), max(values), values[0], values[-1])
+        self.sketch.extend(values)
+
+        start = 0
+        while True:
+            if self.profile and self.profile[-1][0] < self.span:
+                # Top up the last, partial bucket
+                bucket = self.profile[-1]
+                head = values[start:start + self.span - bucket[0]]
+                bucket[0] += len(head)
+                bucket[1] += math.fsum(head)
+                start += len(head)
+            if start == count:
+                break
+            if len(self.profile) + -(-(count - start) // self.span) <= PROFILE_BUCKETS:
+                self.profile.extend(
+                    [len(values[i:i + self.span]), math.fsum(values[i:i + self.span])]
+                    for i in range(start, count, self.span)
+                )
+                break
+            self._coarsen()
+
+    def _combine(self, count, mean, m2, low, high, first, last) -> None:
+        """Join the moments and extremes of values that follow the ones seen so far."""
+        if not self._count:
+            self._count, self._mean, self._m2 = count, mean, m2
+            self._min, self._max, self._first, self._last = low, high, first, last
+            return
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self._count * count / total
+        self._count = total
+        self._min = min(self._min, low)
+        self._max = max(self._max, high)
+        self._last = last
+
+    def _coarsen(self) -> None:
+        """Halve the profile by joining neighbouring buckets."""
+        pairs = zip(self.profile[::2], self.profile[1::2] + [[0, 0.0]])
+        self.profile = [[a[0] + b[0], a[1] + b[1]] for a, b in pairs]
+        self.span *= 2
+
+    def merge(self, other: "RunningStats") -> None:
+        """Fold in the summary of the values that follow this one's."""
+        self._flush()
+        other._flush()
+        if not other._count:
+            return
+        self._combine(other._count, other._mean, other._m2, other._min, other._max, other._first, other._last)
+        self.sketch.merge(other.sketch)
+        self.profile.extend(list(bucket) for bucket in other.profile)
+        self.span = max(self.span, other.span)
+        while len(self.profile) > PROFILE_BUCKETS:
+            self._coarsen()
+
+    @property
+    def count(self) -> int:
+        return self._count + len(self.pending)
+
+    @property
+    def mean(self) -> float:
+        self._flush()
+        return self._mean
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation."""
+        self._flush()
+        return math.sqrt(self._m2 / self._count) if self._count else 0.0
+
+    @property
+    def min(self) -> float:
+        self._flush()
+        return self._min
+
+    @property
+    def max(self) -> float:
+        self._flush()
+        return self._max
+
+    @property
+    def first(self) -> float:
+        self._flush()
+        return self._first
+
+    @property
+    def last(self) -> float:
+        self._flush()
+        return self._last
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile, exact for up to SKETCH_SIZE values."""
+        self._flush()
+        return self.sketch.quantile(q)
+
+    @property
+    def median(self) -> float:
+        """Approximate median (the lower one for an even count)."""
+        return self.quantile(0.5)
+
+    def mean_between(self, start: int, stop: int) -> float:
+        """Mean of the values at positions start..stop-1 (0 for an empty range).
+
+        Exact while each profile bucket holds one value; after that, buckets cut
+        by the range count in proportion, as if their values were all equal.
+        """
+        self._flush()
+        if stop <= start:
+            return 0.0
+        total = 0.0
+        position = 0
+        for count, bucket_sum in self.profile:
+            overlap = min(stop, position + count) - max(start, position)
+            if overlap > 0:
+                total += bucket_sum if overlap == count else bucket_sum * overlap / count
+            position += count
+            if position >= stop:
+                break
+        return total / (stop - start)
+
+    def summary(self) -> dict:
+        """The statistics as a JSON-ready dict."""
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "std": self.std if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "median": self.median,
+            "p95": self.quantile(0.95),
+            "first": self.first,
+            "last": self.last,
+        }
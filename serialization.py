@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+JSON encoding and decoding shared by the trade scripts.
+Uses orjson or msgspec when installed and falls back to the json module.
+"""
+
+import json
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # Fast backends are optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Extensions of files holding one JSON document per line
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+# Errors raised by loads for malformed input, whichever backend is active; the
+# json module reports bytes that are not UTF-8 with UnicodeDecodeError
+DECODE_ERRORS = (
+    (json.JSONDecodeError, UnicodeDecodeError)
+    + ((orjson.JSONDecodeError,) if orjson else ())
+    + ((msgspec.DecodeError,) if msgspec else ())
+)
+
+
+def available_backends() -> list:
+    """Names of the installed backends, fastest first."""
+    names = []
+    if orjson is not None:
+        names.append("orjson")
+    if msgspec is not None:
+        names.append("msgspec")
+    names.append("json")
+    return names
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """Select the backend used by loads/dumps; None picks the fastest installed one.
+
+    Returns the selected name. Raises ValueError for a backend that is not installed.
+    """
+    global BACKEND, _loads, _dumps, _dumps_indent
+    name = name or available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"JSON backend {name!r} is not installed")
+
+    if name == "orjson":
+        _loads = orjson.loads
+        _dumps = orjson.dumps
+        _dumps_indent = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    elif name == "msgspec":
+        _loads = msgspec.json.decode
+        _dumps = msgspec.json.encode
+        _dumps_indent = lambda obj: msgspec.json.format(msgspec.json.encode(obj), indent=2)
+    else:
+        _loads = json.loads
+        _dumps = lambda obj: json.dumps(obj, separators=(",", ":")).encode()
+        _dumps_indent = lambda obj: json.dumps(obj, indent=2).encode()
+    BACKEND = name
+    return name
+
+
+def loads(data):
+    """Decode a JSON document given as bytes or str."""
+    return _loads(data)
+
+
+def dumps(obj) -> str:
+    """Encode obj as compact JSON text."""
+    return _dumps(obj).decode()
+
+
+def load_file(path: str):
+    """Read and decode a JSON file.
+
+    NDJSON (one document per line, as written with --ndjson) is returned as
+    a list of the documents. It is recognised by a .ndjson/.jsonl extension
+    or, failing that, by the file not being a single JSON document.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(NDJSON_EXTENSIONS):
+        return _load_lines(data)
+    try:
+        return _loads(data)
+    except DECODE_ERRORS:
+        if len(data.splitlines()) < 2:
+            raise
+        return _load_lines(data)
+
+
+def _load_lines(data: bytes) -> list:
+    """Decode NDJSON, skipping blank lines."""
+    return [_loads(line) for line in data.splitlines() if line.strip()]
+
+
+def save_file(path: str, obj, indent: bool = True) -> None:
+    """Encode obj into a JSON file, indented by two spaces unless indent=False."""
+    with open(path, "wb") as f:
+        f.write(_dumps_indent(obj) if indent else _dumps(obj))
+
+
+set_backend()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Polymarket API that injects failures, used to check the
+fetch layer's retries, rate limiting and resume points.
+
+Run it directly to point the scripts at it by hand:
+
+    python tests/mock_api.py --port 8765 --trades 5000 --fail-rate 0.3
+
+then set fetch_trades.SEARCH_URL/TRADES_URL to http://127.0.0.1:8765/... .
+"""
+
+import json
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CONDITION_ID = "0x" + "ab" * 32
+START_TIME = 1_700_000_000
+
+
+def make_trades(count: int, seed: int = 1, condition_id: str = CONDITION_ID) -> list:
+    """Synthetic /trades rows for one market, newest first.
+
+    Several trades share each second, and every 50th trade is repeated as an
+    identical fill, so paging has to handle ties and duplicates.
+    """
+    rng = random.Random(seed)
+    trades = []
+    timestamp = START_TIME
+    for i in range(count):
+        timestamp += rng.choice((0, 0, 1, 2, 7))
+        index = rng.randint(0, 1)
+        trade = {
+            "proxyWallet": rng.choice(("0xaaa", "0xbbb", "0xccc")),
+            "side": rng.choice(("BUY", "BUY", "SELL")),
+            "asset": f"{condition_id}-{index}",
+            "conditionId": condition_id,
+            "size": round(rng.uniform(1, 100), 2),
+            "price": round(rng.uniform(0.05, 0.95), 3),
+            "timestamp": timestamp,
+            "title": "Mock market",
+            "outcome": ("Up", "Down")[index],
+            "outcomeIndex": index,
+            "transactionHash": "0x%064x" % rng.getrandbits(256),
+        }
+        trades.append(trade)
+        if i % 50 == 49:
+            trades.append(dict(trade))
+    trades.reverse()
+    return trades
+
+
+class MockAPI:
+    """A threaded mock of /public-search and /trades on 127.0.0.1.
+
+    Failures are configured through attributes, which may be changed while
+    the server runs:
+
+    fail_rate    share of /trades requests that fail
+    fail_status  status of a failed request; 0 drops the connection instead
+    retry_after  Retry-After header sent with a failed request (None for none)
+    fail_after   /trades requests answered before every later one fails
+    fail_offsets offsets whose requests always fail
+    time_filters whether start/end are honoured
+    total        whether pages are wrapped in {"trades": ..., "totalCount": ...}
+    """
+
+    def __init__(self, trades: list, port: int = 0, seed: int = 1):
+        self.trades = trades
+        self.fail_rate = 0.0
+        self.fail_status = 503
+        self.retry_after = "0"
+        self.fail_after = None
+        self.fail_offsets = set()
+        self.time_filters = True
+        self.total = False
+        self.requests = 0
+        self.failures = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "MockAPI":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_fail(self, offset: int) -> bool:
+        with self.lock:
+            self.requests += 1
+            fail = (
+                offset in self.fail_offsets
+                or (self.fail_after is not None and self.requests > self.fail_after)
+                or self.random.random() < self.fail_rate
+            )
+            if fail:
+                self.failures += 1
+            return fail
+
+    def page(self, query: dict) -> list:
+        """The rows a /trades query returns."""
+        rows = [t for t in self.trades if t["conditionId"] == query.get("market", CONDITION_ID)]
+        if "user" in query:
+            rows = [t for t in rows if t["proxyWallet"] == query["user"]]
+        if self.time_filters and "start" in query:
+            rows = [t for t in rows if t["timestamp"] >= int(query["start"])]
+        if self.time_filters and "end" in query:
+            rows = [t for t in rows if t["timestamp"] <= int(query["end"])]
+        offset = int(query.get("offset", 0))
+        return rows[offset:offset + int(query.get("limit", 100))]
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this each
+            # response waits for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, obj, headers=None):
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                if url.path == "/public-search":
+                    market = {"conditionId": CONDITION_ID, "question": "Mock market"}
+                    self.send_json(200, {"events": [{"title": "Mock event", "markets": [market]}]})
+                    return
+                if url.path != "/trades":
+                    self.send_json(404, {"error": "not found"})
+                    return
+                if api._should_fail(int(query.get("offset", 0))):
+                    if not api.fail_status:
+                        self.close_connection = True
+                        self.connection.close()
+                        return
+                    headers = {"Retry-After": api.retry_after} if api.retry_after is not None else {}
+                    self.send_json(api.fail_status, {"error": "injected failure"}, headers)
+                    return
+                rows = api.page(query)
+                if api.total:
+                    rows = {"trades": rows, "totalCount": len(api.page({**query, "offset": 0, "limit": 10 ** 9}))}
+                self.send_json(200, rows)
+
+        return Handler
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Serve a mock Polymarket API that injects failures.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--trades", type=int, default=5000, help="number of synthetic trades (default: 5000)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of /trades requests that fail")
+    parser.add_argument("--fail-status", type=int, default=503, help="status of failures, 0 to drop the connection")
+    parser.add_argument("--total", action="store_true", help="send totalCount with each page")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    api = MockAPI(make_trades(args.trades), port=args.port)
+    api.fail_rate = args.fail_rate
+    api.fail_status = args.fail_status
+    api.total = args.total
+    print(f"Serving {len(api.trades)} trades at {api.url} (condition {CONDITION_ID})")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Checks that every analysis engine gives the same results: the TradeAnalyzer
+loop, the NumPy engine and analyze_parallel's merged chunks, on seeded
+synthetic histories.
+
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import math
+import random
+import unittest
+
+from analyze_trades import TradeAnalyzer, analyze_parallel, analyze_trades, vector_engine
+from bench_analysis import choppy_trades
+from running_stats import PROFILE_BUCKETS, SKETCH_SIZE, RunningStats
+from trade_records import TradeTable
+
+REL_TOL = 1e-9
+ABS_TOL = 1e-9
+CHUNKS = (2, 3, 7)
+
+
+def random_trades(count: int, seed: int, short: bool = False, names=("Up", "Down"), with_index: bool = True) -> list:
+    """API-style rows of a random history; short=True sells more than it buys, so positions go negative."""
+    rng = random.Random(seed)
+    sides = ("BUY", "SELL", "SELL") if short else ("BUY", "BUY", "SELL")
+    timestamp = 1_700_000_000
+    rows = []
+    for _ in range(count):
+        timestamp += rng.randint(0, 40)
+        index = rng.randrange(len(names))
+        row = {
+            "timestamp": timestamp,
+            "side": rng.choice(sides),
+            "outcome": names[index],
+            "size": round(rng.uniform(1, 100), 2),
+            "price": round(rng.uniform(0.3, 0.7), 3),
+        }
+        if with_index:
+            row["outcomeIndex"] = index
+        rows.append(row)
+    return rows
+
+
+class EngineParityTest(unittest.TestCase):
+    def assertClose(self, expected, actual, where):
+        if isinstance(expected, float) or isinstance(actual, float):
+            self.assertTrue(
+                math.isclose(expected, actual, rel_tol=REL_TOL, abs_tol=ABS_TOL),
+                f"{where}: {expected!r} != {actual!r}",
+            )
+        else:
+            self.assertEqual(expected, actual, where)
+
+    def assertSameEntry(self, expected, actual, where):
+        if expected is None or actual is None:
+            self.assertEqual(expected, actual, where)
+            return
+        self.assertEqual(list(expected), list(actual), where)
+        for field in expected:
+            self.assertClose(expected[field], actual[field], f"{where}.{field}")
+
+    def assertSameExtreme(self, expected, actual, where, timeline):
+        """The best/worst moment matches, or is another moment tied with it.
+
+        Equal totals at two moments are common (selling does not move the
+        average cost), and which one wins then depends on the last bit of
+        rounding, which differs between the engines.
+        """
+        if expected is None or actual is None or expected["timestamp"] == actual["timestamp"]:
+            self.assertSameEntry(expected, actual, where)
+            return
+        self.assertClose(expected["total_avg_price"], actual["total_avg_price"], f"{where}.total_avg_price")
+        tied = [entry for entry in timeline if entry["timestamp"] == actual["timestamp"]]
+        self.assertTrue(
+            any(math.isclose(entry["total_avg_price"], actual["total_avg_price"], rel_tol=REL_TOL) for entry in tied),
+            f"{where}: {actual} is not a moment of the timeline",
+        )
+
+    def assertSameStats(self, expected: RunningStats, actual: RunningStats, where, exact_order: bool):
+        expected_summary, actual_summary = expected.summary(), actual.summary()
+        if expected.count > SKETCH_SIZE:
+            # Sketches built from differently ordered or merged batches may pick neighbouring values
+            for field in ("median", "p95"):
+                del expected_summary[field], actual_summary[field]
+        for field in expected_summary:
+            self.assertClose(expected_summary[field], actual_summary[field], f"{where}.{field}")
+        if exact_order or expected.count <= PROFILE_BUCKETS:
+            third = expected.count // 3
+            for start, stop in ((0, third), (expected.count - third, expected.count)):
+                self.assertClose(
+                    expected.mean_between(start, stop), actual.mean_between(start, stop), f"{where}[{start}:{stop}]"
+                )
+
+    def assertSameAnalysis(self, expected: dict, actual: dict, exact_order: bool = True):
+        """Every field of two analyses matches, up to float rounding."""
+        self.assertEqual(sorted(expected), sorted(actual))
+        for key, value in expected.items():
+            other = actual[key]
+            if isinstance(value, RunningStats):
+                self.assertSameStats(value, other, key, exact_order)
+            elif key == "profitability_timeline":
+                self.assertEqual(len(value), len(other), key)
+                for i, (entry, other_entry) in enumerate(zip(value, other)):
+                    self.assertSameEntry(entry, other_entry, f"{key}[{i}]")
+            elif key.endswith("_intervals"):
+                self.assertEqual(list(value), list(other), key)
+            elif key in ("best_profitable", "worst_unprofitable"):
+                self.assertSameExtreme(value, other, key, expected["profitability_timeline"])
+            else:
+                self.assertClose(value, other, key)
+
+    def histories(self):
+        """(name, TradeTable) for every kind of history the engines must agree on."""
+        for seed in range(4):
+            yield f"long {seed}", TradeTable.from_rows(random_trades(1500, seed))
+            yield f"short {seed}", TradeTable.from_rows(random_trades(1500, seed, short=True))
+        yield "flips", TradeTable.from_rows(choppy_trades(1001))
+        yield "yes/no", TradeTable.from_rows(random_trades(800, 11, names=("Yes", "No")))
+        yield "yes/no without outcomeIndex", TradeTable.from_rows(random_trades(800, 11, names=("Yes", "No"), with_index=False))
+        yield "named without outcomeIndex", TradeTable.from_rows(random_trades(800, 14, names=("Trump", "Harris"), with_index=False))
+        yield "3 outcomes", TradeTable.from_rows(random_trades(1500, 12, names=("A", "B", "C")))
+        yield "3 outcomes short", TradeTable.from_rows(random_trades(1500, 13, short=True, names=("A", "B", "C")))
+
+    @unittest.skipIf(vector_engine is None, "NumPy is not installed")
+    def test_numpy_matches_loop(self):
+        for name, table in self.histories():
+            with self.subTest(name):
+                self.assertSameAnalysis(analyze_trades(table, engine="loop"), analyze_trades(table, engine="numpy"))
+
+    def test_parallel_matches_loop(self):
+        for name, table in self.histories():
+            expected = analyze_trades(table, engine="loop")
+            for chunks in CHUNKS:
+                with self.subTest(name, chunks=chunks):
+                    self.assertSameAnalysis(expected, analyze_parallel(table, chunks), exact_order=False)
+
+    def test_incremental_matches_loop(self):
+        for names, with_index in ((("Up", "Down"), True), (("Yes", "No"), False), (("Trump", "Harris"), False)):
+            rows = random_trades(800, 15, names=names, with_index=with_index)
+            with self.subTest(names=names, with_index=with_index):
+                analyzer = TradeAnalyzer(keep_timeline=True)
+                for start in range(0, len(rows), 100):
+                    analyzer.ingest_many(rows[start:start + 100])
+                results = analyzer.snapshot()
+                self.assertEqual(results["outcomes"], list(names))
+                self.assertSameAnalysis(analyze_trades(TradeTable.from_rows(rows), engine="loop"), results)
+
+    def test_outcome_names_do_not_change_results(self):
+        expected = analyze_trades(TradeTable.from_rows(random_trades(800, 11)), engine="loop")
+        for with_index in (True, False):
+            table = TradeTable.from_rows(random_trades(800, 11, names=("Yes", "No"), with_index=with_index))
+            with self.subTest(with_index=with_index):
+                results = analyze_trades(table, engine="loop")
+                self.assertEqual(results["outcomes"], ["Yes", "No"])
+                self.assertSameAnalysis(expected, dict(results, outcomes=expected["outcomes"]))
+
+    def test_three_outcomes(self):
+        results = analyze_trades(TradeTable.from_rows(random_trades(1500, 12, names=("A", "B", "C"))), engine="loop")
+        self.assertEqual(results["outcome_count"], 3)
+        self.assertEqual(results["outcomes"], ["A", "B", "C"])
+        self.assertIn("outcome2_final_position", results)
+        self.assertTrue(results["profitable_intervals"] or results["unprofitable_intervals"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Checks the fetch layer against the failure-injecting mock API: transient
+failures are retried until every trade arrives, and a pull stopped by a
+failure can be resumed to the full set.
+
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import io
+import unittest
+from collections import Counter
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import fetch_trades as ft
+from mock_api import CONDITION_ID, MockAPI, make_trades
+from trade_store import trade_key
+
+PAGE_LIMIT = 100
+PAGINATIONS = ("offset", "cursor", "sharded")
+
+
+class FetchResilienceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.trades = make_trades(2000)
+        cls.api = MockAPI(cls.trades).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.stop()
+
+    def setUp(self):
+        api = self.api
+        api.fail_rate, api.fail_status, api.retry_after = 0.0, 503, "0"
+        api.fail_after, api.fail_offsets, api.total = None, set(), False
+        api.requests = api.failures = 0
+        patches = [
+            mock.patch.object(ft, "TRADES_URL", api.url + "/trades"),
+            mock.patch.object(ft, "SEARCH_URL", api.url + "/public-search"),
+            mock.patch.object(ft, "BACKOFF_BASE", 0.001),
+            mock.patch.object(ft, "MAX_RETRIES", 10),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        ft.set_session(ft.create_session())
+        ft.set_rate_limiter(ft.RateLimiter(0))
+        self.addCleanup(ft.set_session, None)
+
+    def fetch(self, **options):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            return ft.fetch_trades_with_report(CONDITION_ID, None, PAGE_LIMIT, **options)
+
+    def resume(self, trades, report, **options):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            return ft.resume_fetch(CONDITION_ID, None, trades, report, page_limit=PAGE_LIMIT, **options)
+
+    def assertAllTrades(self, trades):
+        self.assertEqual(Counter(map(trade_key, trades)), Counter(map(trade_key, self.trades)))
+
+    def test_transient_failures_are_retried(self):
+        self.api.fail_rate = 0.25
+        for status in (503, 429, 0):
+            for pagination in PAGINATIONS:
+                with self.subTest(status=status, pagination=pagination):
+                    self.api.fail_status = status
+                    self.api.failures = 0
+                    trades, report = self.fetch(pagination=pagination)
+                    self.assertGreater(self.api.failures, 0)
+                    self.assertTrue(report["complete"], ft.describe_report(report))
+                    self.assertAllTrades(trades)
+
+    def test_retry_after_pauses_every_worker(self):
+        self.api.fail_status, self.api.retry_after = 429, "1"
+        self.api.fail_offsets = {0}
+        limiter = ft.RateLimiter(0)
+        ft.set_rate_limiter(limiter)
+        with mock.patch.object(ft, "MAX_RETRIES", 1), mock.patch.object(ft.time, "sleep") as sleep:
+            trades, report = self.fetch()
+        self.assertIsNotNone(report["error"])
+        self.assertGreater(limiter.paused_until, 0)
+        self.assertTrue(any(call.args[0] > 0.5 for call in sleep.call_args_list))
+
+    def test_resume_offset(self):
+        for total in (False, True):
+            with self.subTest(total=total):
+                self.api.total = total
+                self.api.fail_offsets = {5 * PAGE_LIMIT}
+                with mock.patch.object(ft, "MAX_RETRIES", 1):
+                    trades, report = self.fetch(page_workers=4)
+                self.assertFalse(report["complete"])
+                self.assertEqual(report["resume_offset"], 5 * PAGE_LIMIT)
+                self.assertEqual(len(trades), 5 * PAGE_LIMIT)
+
+                self.api.fail_offsets = set()
+                trades, report = self.resume(trades, report, page_workers=4)
+                self.assertTrue(report["complete"], ft.describe_report(report))
+                self.assertAllTrades(trades)
+
+    def test_resume_cursor(self):
+        for pagination in ("cursor", "sharded"):
+            with self.subTest(pagination=pagination):
+                self.api.requests = 0
+                self.api.fail_after = 6
+                with mock.patch.object(ft, "MAX_RETRIES", 0):
+                    trades, report = self.fetch(pagination=pagination, page_workers=2)
+                self.assertFalse(report["complete"])
+                self.assertIsNotNone(report["resume_cursor"])
+                self.assertLess(len(trades), len(self.trades))
+
+                self.api.fail_after = None
+                trades, report = self.resume(trades, report, pagination=pagination, page_workers=2)
+                self.assertTrue(report["complete"], ft.describe_report(report))
+                self.assertAllTrades(trades)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Checks TradeAnalyzer's incremental use: a snapshot is unaffected by trades
+ingested after it.
+
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import unittest
+
+from analyze_trades import TradeAnalyzer
+from test_engine_parity import random_trades
+
+
+class TradeAnalyzerTest(unittest.TestCase):
+    def test_snapshot_is_independent_of_later_trades(self):
+        rows = random_trades(600, 3)
+        analyzer = TradeAnalyzer(keep_timeline=True)
+        analyzer.ingest_many(rows[:300])
+        snapshot = analyzer.snapshot()
+        before = {
+            key: value.summary() if hasattr(value, "summary") else list(value) if hasattr(value, "__len__") else value
+            for key, value in snapshot.items()
+        }
+
+        analyzer.ingest_many(rows[300:])
+        for key, value in snapshot.items():
+            with self.subTest(key):
+                if hasattr(value, "summary"):
+                    self.assertEqual(value.summary(), before[key])
+                elif hasattr(value, "__len__"):
+                    self.assertEqual(list(value), before[key])
+                else:
+                    self.assertEqual(value, before[key])
+        self.assertEqual(analyzer.snapshot()["trade_count"], 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Compact trade records used by the analysis scripts.
+API trades are reduced once, at load or fetch time, to the fields the analysis
+reads: either as Trade records or as a columnar TradeTable.
+"""
+
+from sys import intern
+from array import array
+from typing import Optional
+
+
+class Trade:
+    """One fill with only the fields the analysis reads.
+
+    side, outcome and condition_id are interned, so the many trades of a
+    market share a single copy of each string and compare by identity.
+    """
+
+    __slots__ = ("timestamp", "side", "outcome", "outcome_index", "size", "price", "condition_id")
+
+    def __init__(
+        self,
+        timestamp: int,
+        side: str,
+        outcome: str,
+        size: float,
+        price: float,
+        outcome_index: Optional[int] = None,
+        condition_id: Optional[str] = None,
+    ):
+        self.timestamp = timestamp
+        self.side = intern(side)
+        self.outcome = intern(outcome)
+        self.size = size
+        self.price = price
+        self.outcome_index = outcome_index
+        self.condition_id = intern(condition_id) if condition_id else None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Trade":
+        """Build a record from a /trades API row."""
+        return cls(
+            int(data["timestamp"]),
+            data["side"],
+            data["outcome"],
+            float(data["size"]),
+            float(data["price"]),
+            data.get("outcomeIndex"),
+            data.get("conditionId"),
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+        # Interning does not survive pickling
+        self.side = intern(self.side)
+        self.outcome = intern(self.outcome)
+        if self.condition_id:
+            self.condition_id = intern(self.condition_id)
+
+    def __repr__(self) -> str:
+        return (
+            f"Trade(timestamp={self.timestamp}, side={self.side!r}, outcome={self.outcome!r}, "
+            f"size={self.size}, price={self.price})"
+        )
+
+
+# Codes stored in TradeTable.side
+BUY = 0
+SELL = 1
+_SIDE_CODES = {"BUY": BUY, "SELL": SELL}
+
+# outcomeIndex of the usual binary outcome names, for rows that lack it
+BINARY_OUTCOMES = {"Yes": 0, "Up": 0, "No": 1, "Down": 1}
+
+
+def assign_outcome(outcomes: list, name: str, index: Optional[int] = None) -> int:
+    """Add a newly seen outcome to outcomes (names listed by code) and return its code.
+
+    The code is the API's outcomeIndex when known, else the usual index of a
+    binary name (Yes/Up 0, No/Down 1); other names, and an index that
+    another name already holds, take the lowest free code.
+    """
+    index = BINARY_OUTCOMES.get(name) if index is None else int(index)
+    if index is None or (index < len(outcomes) and outcomes[index] not in (None, name)):
+        index = outcomes.index(None) if None in outcomes else len(outcomes)
+    outcomes.extend([None] * (index + 1 - len(outcomes)))
+    outcomes[index] = intern(name)
+    return index
+
+
+def outcome_labels(count: int) -> list:
+    """Prefixes of the per-outcome analysis keys, by code.
+
+    A binary market keeps the up_/down_ keys (Yes/Up first, No/Down second);
+    an N-way market uses outcome0_, outcome1_, ...
+    """
+    return ["up", "down"] if count == 2 else [f"outcome{code}" for code in range(count)]
+
+
+class TradeTable:
+    """Trades stored column by column in typed arrays, oldest first.
+
+    timestamp, price and size hold one value per trade; side holds BUY/SELL
+    and outcome the outcome's code, its outcomeIndex in the market (see
+    assign_outcome). outcomes lists the names by code, with None for codes
+    no trade has. A trade costs 27 bytes instead of a dict or record.
+    """
+
+    def __init__(self):
+        self.timestamp = array("q")
+        self.price = array("d")
+        self.size = array("d")
+        self.side = array("b")
+        self.outcome = array("h")
+        self.outcomes = []
+
+    @classmethod
+    def from_rows(cls, rows) -> "TradeTable":
+        """Build a table in one pass over API rows (dicts) or Trade records."""
+        table = cls()
+        codes = {}
+        timestamp, price, size, side, outcome = table.timestamp, table.price, table.size, table.side, table.outcome
+        for row in rows:
+            if isinstance(row, dict):
+                ts, trade_side, name, trade_size, trade_price = (
+                    row["timestamp"], row["side"], row["outcome"], row["size"], row["price"]
+                )
+            else:
+                ts, trade_side, name, trade_size, trade_price = row.timestamp, row.side, row.outcome, row.size, row.price
+            code = codes.get(name)
+            if code is None:
+                index = row.get("outcomeIndex") if isinstance(row, dict) else row.outcome_index
+                code = codes[name] = assign_outcome(table.outcomes, name, index)
+            timestamp.append(int(ts))
+            price.append(trade_price)
+            size.append(trade_size)
+            side.append(_SIDE_CODES.get(trade_side, SELL))
+            outcome.append(code)
+        table._sort()
+        return table
+
+    def _sort(self) -> None:
+        """Stable-sort every column by timestamp, unless already sorted."""
+        ts = self.timestamp
+        if all(ts[i] <= ts[i + 1] for i in range(len(ts) - 1)):
+            return
+        order = sorted(range(len(ts)), key=ts.__getitem__)
+        for name in ("timestamp", "price", "size", "side", "outcome"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[i] for i in order]))
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def outcome_count(self) -> int:
+        """Number of outcome codes, at least the two of a binary market."""
+        return max(2, len(self.outcomes))
+
+    def slice(self, start: int, stop: int) -> "TradeTable":
+        """Trades start..stop-1 as a new table with the same outcome codes."""
+        part = TradeTable()
+        for name in ("timestamp", "price", "size", "side", "outcome"):
+            setattr(part, name, getattr(self, name)[start:stop])
+        part.outcomes = list(self.outcomes)
+        return part
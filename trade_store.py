@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Local SQLite store of fetched trades, keyed by market (conditionId) and user.
+Lets repeated runs fetch only the trades that are newer than what is stored.
+"""
+
+import sqlite3
+from collections import Counter
+from typing import Optional
+
+from serialization import dumps, loads
+
+DEFAULT_STORE_FILE = "trades.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    condition_id TEXT NOT NULL,
+    user_address TEXT NOT NULL,
+    trade_key TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (condition_id, user_address, trade_key, occurrence)
+);
+CREATE INDEX IF NOT EXISTS trades_by_time ON trades (condition_id, user_address, timestamp);
+"""
+
+
+def trade_key(trade: dict) -> tuple:
+    """Identity of a single fill, used to spot the same trade on two pages."""
+    return (
+        trade.get("transactionHash"),
+        trade.get("asset"),
+        trade.get("side"),
+        trade.get("size"),
+        trade.get("price"),
+        trade.get("timestamp"),
+    )
+
+
+def _user_column(user_address: Optional[str]) -> str:
+    """Value of the user_address column; whole-market trades are stored under ''."""
+    return user_address.lower() if user_address else ""
+
+
+class TradeStore:
+    """Trades stored per (conditionId, user), deduplicated by transaction.
+
+    A user_address of None stands for every participant, i.e. a whole-market pull.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def latest_timestamp(self, condition_id: str, user_address: Optional[str]) -> Optional[int]:
+        """Timestamp of the newest stored trade, or None if nothing is stored."""
+        row = self.conn.execute(
+            "SELECT MAX(timestamp) FROM trades WHERE condition_id = ? AND user_address = ?",
+            (condition_id, _user_column(user_address)),
+        ).fetchone()
+        return row[0]
+
+    def add_trades(self, condition_id: str, user_address: Optional[str], trades: list) -> int:
+        """Store trades, skipping ones already present. Returns the number added.
+
+        Identical fills (same key) are told apart by their occurrence among the
+        trades passed in, so trades must hold every fill of a key: a pull from
+        since does, as it includes the whole second of the newest stored trade.
+        """
+        occurrences = Counter()
+        rows = []
+        for trade in trades:
+            key = "|".join(str(part) for part in trade_key(trade))
+            rows.append((
+                condition_id,
+                _user_column(user_address),
+                key,
+                occurrences[key],
+                int(trade.get("timestamp", 0)),
+                dumps(trade),
+            ))
+            occurrences[key] += 1
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def load_trades(self, condition_id: str, user_address: Optional[str]) -> list:
+        """All stored trades for a market/user, oldest first."""
+        cursor = self.conn.execute(
+            "SELECT data FROM trades WHERE condition_id = ? AND user_address = ? ORDER BY timestamp",
+            (condition_id, _user_column(user_address)),
+        )
+        return [loads(data) for (data,) in cursor]
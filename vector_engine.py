@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Vectorized NumPy engine for analyze_trades.
+Computes the same results as the reference loop from a TradeTable's columns
+with cumulative sums, masks and a prefix scan instead of one Python step per trade.
+"""
+
+from collections.abc import Sequence
+import numpy as np
+
+from running_stats import RunningStats
+from trade_records import BUY, outcome_labels
+
+# Codes of the is_profitable column: True, False and None (not applicable)
+PROFITABLE = 1
+UNPROFITABLE = 0
+NOT_APPLICABLE = -1
+_PROFITABLE_VALUES = {PROFITABLE: True, UNPROFITABLE: False, NOT_APPLICABLE: None}
+
+
+def _affine_scan(alpha: np.ndarray, beta: np.ndarray) -> np.ndarray:
+    """Solve x[i] = alpha[i] * x[i-1] + beta[i] with x[-1] = 0 for every i.
+
+    Affine maps compose associatively, so this is a Hillis-Steele prefix scan
+    in log2(n) vector steps. alpha lies in [0, 1], so no step can overflow.
+    """
+    alpha = alpha.copy()
+    beta = beta.copy()
+    step = 1
+    while step < len(beta):
+        beta[step:] = alpha[step:] * beta[:-step] + beta[step:]
+        alpha[step:] = alpha[step:] * alpha[:-step]
+        step *= 2
+    return beta
+
+
+def _average_cost(is_buy: np.ndarray, size: np.ndarray, price: np.ndarray):
+    """Running position and average price after each trade of one outcome.
+
+    Follows the reference rule: a buy adds its value to the cost, a sell that
+    leaves shares scales the cost down with the position (the average price is
+    unchanged), and a sell that leaves none resets cost and average to 0.
+    """
+    position = np.cumsum(np.where(is_buy, size, -size))
+    previous = np.concatenate(([0.0], position[:-1]))
+    keeps_shares = position > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sell_ratio = np.where(keeps_shares, position / previous, 0.0)
+        alpha = np.where(is_buy, 1.0, sell_ratio)
+        beta = np.where(is_buy, size * price, 0.0)
+        cost = _affine_scan(alpha, beta)
+        avg_price = np.where(keeps_shares, cost / position, 0.0)
+    return position, avg_price
+
+
+def _forward_fill(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Spread per-outcome values over every trade, holding the last value (0 before the first)."""
+    seen = np.cumsum(mask)
+    return np.where(seen > 0, np.concatenate(([0.0], values))[seen], 0.0)
+
+
+def _intervals(codes: np.ndarray, timestamps: np.ndarray) -> tuple:
+    """Runs of equal profitability, skipping not-applicable trades.
+
+    A run-length encoding of the flag column that returns the same intervals
+    as TradeAnalyzer, which tracks the runs trade by trade.
+    """
+    applicable = np.flatnonzero(codes != NOT_APPLICABLE)
+    if not len(applicable):
+        return [], []
+    states = codes[applicable]
+    flips = np.flatnonzero(states[1:] != states[:-1]) + 1
+    starts = applicable[np.concatenate(([0], flips))]
+    ends = np.concatenate((applicable[flips] - 1, [len(codes) - 1]))
+    profitable, unprofitable = [], []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        start_ts, end_ts = int(timestamps[start]), int(timestamps[end])
+        interval = {
+            "start_index": start,
+            "end_index": end,
+            "start_timestamp": start_ts,
+            "end_timestamp": end_ts,
+        }
+        (profitable if codes[start] == PROFITABLE else unprofitable).append(interval)
+    return profitable, unprofitable
+
+
+class Timeline(Sequence):
+    """Profitability timeline kept as columns; entries are built when read.
+
+    Each entry is the same dict the reference loop produces, so printing and
+    exporting work unchanged, but only entries actually read are materialized.
+    """
+
+    def __init__(self, timestamps, labels, avg_prices, total_avg, codes, positions):
+        self.timestamps = timestamps
+        self.avg_columns = [(f"{label}_avg_price", column) for label, column in zip(labels, avg_prices)]
+        self.total_avg = total_avg
+        self.codes = codes
+        self.position_columns = [(f"{label}_position", column) for label, column in zip(labels, positions)]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        entry = {"timestamp": int(self.timestamps[index])}
+        for key, column in self.avg_columns:
+            entry[key] = float(column[index])
+        entry["total_avg_price"] = float(self.total_avg[index])
+        entry["is_profitable"] = _PROFITABLE_VALUES[int(self.codes[index])]
+        for key, column in self.position_columns:
+            entry[key] = float(column[index])
+        return entry
+
+
+def analyze_table(table) -> dict:
+    """Analyze a TradeTable; returns the same keys as analyze_trades."""
+    # Zero-copy views of the table's columns
+    timestamps = np.frombuffer(table.timestamp, dtype=np.int64)
+    price = np.frombuffer(table.price, dtype=np.float64)
+    size = np.frombuffer(table.size, dtype=np.float64)
+    is_buy = np.frombuffer(table.side, dtype=np.int8) == BUY
+    outcome = np.frombuffer(table.outcome, dtype=np.int16)
+    labels = outcome_labels(table.outcome_count)
+
+    results = {}
+    positions, avg_prices = [], []
+    for code, name in enumerate(labels):
+        mask = outcome == code
+        buys, sells = mask & is_buy, mask & ~is_buy
+        shares_bought, shares_sold = float(size[buys].sum()), float(size[sells].sum())
+        cost_basis = float((size[buys] * price[buys]).sum())
+        proceeds = float((size[sells] * price[sells]).sum())
+        position, avg_price = _average_cost(is_buy[mask], size[mask], price[mask])
+        positions.append(_forward_fill(mask, position))
+        avg_prices.append(_forward_fill(mask, avg_price))
+        final_position = shares_bought - shares_sold
+        last_avg = float(avg_price[-1]) if len(avg_price) else 0.0
+
+        results.update({
+            f"{name}_buy_count": int(np.count_nonzero(buys)),
+            f"{name}_sell_count": int(np.count_nonzero(sells)),
+            f"{name}_shares_bought": shares_bought,
+            f"{name}_shares_sold": shares_sold,
+            f"{name}_cost_basis": cost_basis,
+            f"{name}_proceeds": proceeds,
+            f"{name}_final_position": final_position,
+            f"{name}_avg_price": last_avg if final_position > 0 else 0,
+            f"{name}_realized_pnl": proceeds - shares_sold * (cost_basis / shares_bought if shares_bought > 0 else 0),
+            f"{name}_buy_price_stats": RunningStats.from_array(price[buys]),
+            f"{name}_sell_price_stats": RunningStats.from_array(price[sells]),
+            f"{name}_buy_size_stats": RunningStats.from_array(size[buys]),
+        })
+
+    held = [position > 0 for position in positions]
+    # Summed in code order, like the loop engine
+    total_avg = sum(np.where(is_held, avg, 0.0) for is_held, avg in zip(held, avg_prices))
+    codes = np.where(
+        np.logical_and.reduce(held),
+        np.where(total_avg < 1.0, PROFITABLE, UNPROFITABLE),
+        NOT_APPLICABLE,
+    ).astype(np.int8)
+
+    profitable_intervals, unprofitable_intervals = _intervals(codes, timestamps)
+    timeline = Timeline(timestamps, labels, avg_prices, total_avg, codes, positions)
+    # argmin/argmax return the first of equal values, like min()/max() over the timeline
+    extremes = {}
+    for code, pick in ((PROFITABLE, np.argmin), (UNPROFITABLE, np.argmax)):
+        hits = np.flatnonzero(codes == code)
+        extremes[code] = timeline[int(hits[pick(total_avg[hits])])] if len(hits) else None
+    gaps = np.diff(timestamps)
+
+    results.update({
+        "outcome_count": len(labels),
+        "outcomes": table.outcomes + [None] * (len(labels) - len(table.outcomes)),
+        "trade_count": len(table),
+        "first_timestamp": int(timestamps[0]) if len(table) else None,
+        "last_timestamp": int(timestamps[-1]) if len(table) else None,
+        "profitability_timeline": timeline,
+        "profitable_intervals": profitable_intervals,
+        "unprofitable_intervals": unprofitable_intervals,
+        "first_profitable": profitable_intervals[0]["start_timestamp"] if profitable_intervals else None,
+        "first_unprofitable": unprofitable_intervals[0]["start_timestamp"] if unprofitable_intervals else None,
+        "best_profitable": extremes[PROFITABLE],
+        "worst_unprofitable": extremes[UNPROFITABLE],
+        "total_realized_pnl": sum(results[f"{name}_realized_pnl"] for name in labels),
+        "avg_time_between_trades": float(gaps.mean()) / 60 if len(gaps) else 0,
+    })
+    return results